@@ -1,30 +1,194 @@
 import streamlit as st
 from google import genai
+from google.genai import types
 import time
 import os
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 
-def vibe_coach(video_path, result_context, model_id="gemini-3-flash-preview"):
-    """
-    Analyzes a golf swing based on video and optional ball flight data.
-    """
-    # Initialize using the Google API key stored in Streamlit secrets
-    client = genai.Client(api_key=st.secrets["GOOGLE_API_KEY"])
-    
-    # 1. Upload Video
-    video_file = client.files.upload(file=video_path)
-    
-    # 2. Poll for completion
+import profiling
+import chat_cache
+from uploads import stream_sha256
+
+logger = logging.getLogger(__name__)
+
+# Background uploads: started as soon as a swing arrives, awaited when the coach is asked
+_upload_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gemini-upload")
+
+# Give up on Gemini's video processing after this long instead of spinning forever
+PROCESSING_DEADLINE_SECONDS = 180
+
+# Don't hand out an uploaded file that expires sooner than this
+EXPIRY_MARGIN = timedelta(minutes=10)
+
+# Chat sessions: the swing media, coaching instructions and report go into an explicit
+# Gemini context cache once per swing; each turn then sends only a bounded history
+CONTEXT_CACHE_TTL_SECONDS = int(os.environ.get("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+CHAT_HISTORY_MESSAGES = 6    # most recent messages sent word for word
+CHAT_SUMMARY_CHARS = 1200    # cap on the digest of everything older
+# Context caches are billed per hour of storage: delete one nobody has asked about for this long
+CONTEXT_IDLE_SECONDS = int(os.environ.get("GEMINI_CONTEXT_IDLE", "900"))
+# Gemini refuses to cache less than this many tokens (per model; the larger figure when unlisted)
+CONTEXT_MIN_TOKENS = {"gemini-2.5-flash": 1024, "gemini-3-flash-preview": 1024}
+CONTEXT_MIN_TOKENS_DEFAULT = 4096
+
+# What the coach is shown: "proxy" (swing window only, downscaled; see clip_proxy),
+# "stills" (address/top/transition/impact frames) or "full" (the raw upload)
+UPLOAD_MODES = ("proxy", "stills", "full")
+UPLOAD_MODE = os.environ.get("GEMINI_UPLOAD_MODE", "proxy")
+
+# Process-wide state shared by every session: one client per API key, and
+# (api key, video hash, upload mode) -> Future of the prepared media parts
+_clients = {}
+_uploads = {}
+_contexts = {}  # (api key, model, video hash, upload mode, report hash) -> (CachedContent, last used)
+_context_failures = {}  # same key -> when creating its cache last failed (retried after the cache TTL)
+_lock = threading.Lock()
+
+
+def get_client(api_key=None):
+    """Returns the shared genai.Client for this key instead of building one per call."""
+    api_key = api_key or st.secrets["GOOGLE_API_KEY"]
+    with _lock:
+        if api_key not in _clients:
+            _clients[api_key] = genai.Client(api_key=api_key)
+        return _clients[api_key]
+
+
+def _file_sha256(path):
+    with open(path, "rb") as f:
+        return stream_sha256(f)
+
+
+def _wait_until_processed(client, video_file, deadline_seconds=PROCESSING_DEADLINE_SECONDS):
+    """Polls with exponential backoff (0.5s -> 8s) until the file leaves PROCESSING."""
+    deadline = time.monotonic() + deadline_seconds
+    delay = 0.5
     while video_file.state.name == "PROCESSING":
-        time.sleep(2)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Gemini is still processing the video after {deadline_seconds}s.")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 8)
         video_file = client.files.get(name=video_file.name)
+    return video_file
+
+
+def upload_video(video_path, api_key):
+    """Uploads the swing and waits until Gemini has processed it."""
+    client = get_client(api_key)
+    with profiling.timer("gemini.upload"):
+        video_file = client.files.upload(file=video_path)
+    with profiling.timer("gemini.processing"):
+        return _wait_until_processed(client, video_file)
+
+
+def prepare_media(video_path, api_key, mode=None, video_hash=None):
+    """
+    Builds what Gemini is shown for this swing, per upload `mode`, as a list of
+    content parts: the processed proxy / full video file, or labelled JPEG stills.
+    """
+    mode = mode or UPLOAD_MODE
+    if mode == "stills":
+        # Imported here so the coach (and the app's first render) doesn't wait on cv2
+        from clip_proxy import key_frames
+        with profiling.timer("gemini.prepare_stills"):
+            stills = key_frames(video_path, video_hash=video_hash)
+        if stills:
+            parts = []
+            for phase, jpeg in stills:
+                parts += [f"{phase.upper()}:", types.Part.from_bytes(data=jpeg, mime_type="image/jpeg")]
+            return parts
+        mode = "proxy"  # no swing found to take stills of; send the clip instead
+
+    if mode == "proxy":
+        from clip_proxy import make_proxy
+        try:
+            with profiling.timer("gemini.prepare_proxy"):
+                video_path = make_proxy(video_path, video_hash=video_hash)
+        except Exception as e:
+            logger.warning("Couldn't build a proxy clip, uploading the original: %s", e)
+    return [upload_video(video_path, api_key)]
+
+
+def _uploaded_files(media):
+    # Inline parts (prompt text, JPEG stills) have no remote state
+    return [part for part in media if hasattr(part, "state")]
+
+
+def _media_failed(media):
+    return any(f.state.name == "FAILED" for f in _uploaded_files(media))
+
+
+def _still_usable(upload):
+    """In-flight uploads and processed files that aren't about to expire can be reused."""
+    if not upload.done():
+        return True
+    if upload.exception() is not None:
+        return False
+    media = upload.result()
+    if _media_failed(media):
+        return False
+    now = datetime.now(timezone.utc)
+    return all(f.expiration_time is None or f.expiration_time - now > EXPIRY_MARGIN for f in _uploaded_files(media))
+
+
+def start_upload(video_path, video_hash=None, mode=None):
+    """
+    Kicks off media preparation (proxy encode or stills) plus upload and processing
+    in the background and returns a Future. Hand it to vibe_coach(upload=...) so
+    local labs can run while Gemini catches up.
+    The same clip (by content hash) is only prepared once per process and upload
+    mode: switching model or shot context reuses the already-processed remote file.
+    """
+    # Read secrets on the script thread; the worker thread only gets the key
+    api_key = st.secrets["GOOGLE_API_KEY"]
+    video_hash = video_hash or _file_sha256(video_path)
+    mode = mode or UPLOAD_MODE
+    key = (api_key, video_hash, mode)
+
+    with _lock:
+        _prune_uploads()
+        upload = _uploads.get(key)
+        if upload is None or not _still_usable(upload):
+            upload = _upload_pool.submit(prepare_media, video_path, api_key, mode, video_hash)
+            _uploads[key] = upload
+        return upload
 
-    if video_file.state.name == "FAILED":
-        return "Error: AI could not process this video."
 
-    # 3. Flexible Prompting
-    prompt = f"""
+def _prune_uploads():
+    """Forgets failed and expiring uploads (Gemini deletes the files itself). Caller holds _lock."""
+    for key in [k for k, upload in _uploads.items() if not _still_usable(upload)]:
+        del _uploads[key]
+
+
+def _prepared_media(video_path, upload=None, mode=None):
+    """Waits for the (usually background) upload; returns the media parts for the prompt."""
+    media = None
+    if upload is not None:
+        try:
+            media = upload.result()
+        except Exception as e:
+            # A failed background upload shouldn't poison the button; retry once
+            profiling.count("gemini.upload_errors")
+            logger.warning("Background upload failed, retrying: %s", e)
+    if media is None:
+        media = start_upload(video_path, mode=mode).result()
+    return media
+
+
+def _vibe_prompt(result_context, stills=False):
+    shown = (
+        "You are shown still frames of the key positions (address, top, transition, impact), each labelled, instead of the video."
+        if stills else ""
+    )
+    return f"""
     You are a world-class PGA swing coach. 
     RESULT CONTEXT: {result_context}
+    {shown}
 
     YOUR MISSION:
     1. If context is 'unknown', analyze pure technical form.
@@ -36,26 +200,9 @@ def vibe_coach(video_path, result_context, model_id="gemini-3-flash-preview"):
     - THE TOOLBOX: Recommend 'X-Ray Diagnostic' (stability/plane) or 'Wrist Lab' (hinge/release).
     """
 
-    # 4. Generate Content
-    # SYNCED: Uses the model_id passed from web_coach.py
-    response = client.models.generate_content(
-        model=model_id,
-        contents=[prompt, video_file]
-    )
-
-    return response.text
 
-# =====================================================================
-# NEW FUNCTION: Must be completely outside, pushed to the left margin!
-# =====================================================================
-def coach_chat(question, previous_report, model_id):
-    """Answers follow-up questions based on the initial swing analysis."""
-    from google import genai
-    
-    # Initialize using the same Google API key from Streamlit secrets
-    client = genai.Client(api_key=st.secrets["GOOGLE_API_KEY"])
-    
-    prompt = f"""
+def _chat_prompt(question, previous_report):
+    return f"""
     You are an expert, encouraging golf coach. You just provided the following swing analysis to your student:
     
     ---
@@ -66,16 +213,333 @@ def coach_chat(question, previous_report, model_id):
     
     Answer their question clearly, simply, and conversationally. If they ask to define a term (like 'laid off' or 'early extension'), explain it using simple biomechanics or visuals they can easily feel.
     """
+
+
+def _definition_prompt(question):
+    # No report: the answer is shared with every student who asks the same thing
+    return f"""
+    You are an expert, encouraging golf coach. A student asked: "{question}"
     
-    try:
-        # Wrap the API call to catch server hiccups
+    Define the term clearly, simply, and conversationally, using simple biomechanics or visuals they can easily feel. Don't refer to any particular student's swing.
+    """
+
+
+def _chat_request(question, previous_report):
+    """The prompt for a follow-up, and whether it's a report-independent definition."""
+    if chat_cache.definition_term(question) is not None:
+        return _definition_prompt(question), True
+    return _chat_prompt(question, previous_report), False
+
+
+def _timed_stream(chunks):
+    """Yields the text of each streamed chunk, timing first-chunk latency and the whole stream."""
+    t0 = first = profiling.start()
+    for chunk in chunks:
+        if first:
+            profiling.stop("gemini.first_chunk", first)
+            first = 0.0
+        if chunk.text:
+            yield chunk.text
+    profiling.stop("gemini.generate_stream", t0)
+
+
+VIDEO_FAILED_MESSAGE = "Error: AI could not process this video."
+CHAT_SNAG_MESSAGE = "I'm sorry, I hit a momentary snag while thinking about your swing. Could you please try asking that again?"
+
+
+def _vibe_contents(result_context, media):
+    stills = not _uploaded_files(media)
+    return [_vibe_prompt(result_context, stills=stills), *media]
+
+
+def vibe_coach(video_path, result_context, model_id="gemini-3-flash-preview", upload=None, upload_mode=None):
+    """
+    Analyzes a golf swing based on video and optional ball flight data.
+    Pass the Future from start_upload() as `upload` to reuse a background upload;
+    otherwise `upload_mode` (see UPLOAD_MODES) picks what is sent.
+    """
+    # Shared client for the Google API key stored in Streamlit secrets
+    client = get_client()
+    
+    # 1 + 2. Upload Video and wait for processing (usually already done in the background)
+    media = _prepared_media(video_path, upload, upload_mode)
+    if _media_failed(media):
+        return VIDEO_FAILED_MESSAGE
+
+    # 3. Generate Content
+    # SYNCED: Uses the model_id passed from web_coach.py
+    with profiling.timer("gemini.generate"):
         response = client.models.generate_content(
             model=model_id,
-            contents=prompt
+            contents=_vibe_contents(result_context, media)
         )
+
+    return response.text
+
+
+def vibe_coach_stream(video_path, result_context, model_id="gemini-3-flash-preview", upload=None, upload_mode=None):
+    """Same as vibe_coach, but yields the report text as Gemini streams it (for st.write_stream)."""
+    client = get_client()
+
+    media = _prepared_media(video_path, upload, upload_mode)
+    if _media_failed(media):
+        yield VIDEO_FAILED_MESSAGE
+        return
+
+    yield from _timed_stream(client.models.generate_content_stream(
+        model=model_id,
+        contents=_vibe_contents(result_context, media)
+    ))
+
+# =====================================================================
+# NEW FUNCTION: Must be completely outside, pushed to the left margin!
+# =====================================================================
+def coach_chat(question, previous_report, model_id):
+    """Answers follow-up questions based on the initial swing analysis."""
+    # Repeat questions (and common definitions from any user) skip the round trip
+    cached = chat_cache.lookup(model_id, previous_report, question)
+    if cached is not None:
+        profiling.count("gemini.chat_cache_hits")
+        return cached
+
+    # Same shared client as vibe_coach
+    client = get_client()
+    prompt, definition = _chat_request(question, previous_report)
+    
+    try:
+        # Wrap the API call to catch server hiccups
+        with profiling.timer("gemini.chat"):
+            response = client.models.generate_content(
+                model=model_id,
+                contents=prompt
+            )
+        if response.text:
+            chat_cache.store(model_id, previous_report, question, response.text, definition=definition)
         return response.text
-    except Exception as e:
+    except Exception:
         # Instead of crashing, we return a helpful message to the user
-        print(f"Error calling Gemini: {e}") # This shows up in your terminal/logs
-        return "I'm sorry, I hit a momentary snag while thinking about your swing. Could you please try asking that again?"
+        profiling.count("gemini.errors")
+        logger.exception("Error calling Gemini")
+        return CHAT_SNAG_MESSAGE
+
+
+def coach_chat_stream(question, previous_report, model_id):
+    """Streaming coach_chat: yields the answer sentence by sentence as it is generated."""
+    cached = chat_cache.lookup(model_id, previous_report, question)
+    if cached is not None:
+        profiling.count("gemini.chat_cache_hits")
+        yield cached
+        return
+
+    client = get_client()
+    prompt, definition = _chat_request(question, previous_report)
+
+    parts = []
+    try:
+        for text in _timed_stream(client.models.generate_content_stream(
+            model=model_id,
+            contents=prompt
+        )):
+            parts.append(text)
+            yield text
+    except Exception:
+        profiling.count("gemini.errors")
+        logger.exception("Error calling Gemini")
+        yield CHAT_SNAG_MESSAGE
+        return
+
+    # Only complete answers are cached; an abandoned or failed stream isn't
+    if parts:
+        chat_cache.store(model_id, previous_report, question, "".join(parts), definition=definition)
+
+
+def _session_instruction():
+    return """
+    You are an expert, encouraging golf coach. You have watched this student's swing (attached) and given them the swing report that follows it.
+    Answer their follow-up questions clearly, simply, and conversationally. Point to what you can see in their swing when it helps, and explain terms using simple biomechanics or visuals they can easily feel.
+    """
+
+
+def _context_media(client, model_id, video_path, video_hash, mode, report):
+    """
+    The cache contents (media + report) for this swing, or None if even the full
+    upload is below the model's minimum cache size. A trimmed proxy or a few stills
+    often are, so those fall back to the full upload rather than to no cache.
+    """
+    minimum = CONTEXT_MIN_TOKENS.get(model_id, CONTEXT_MIN_TOKENS_DEFAULT)
+    for media_mode in dict.fromkeys([mode, "full"]):
+        # Same background upload the report used, so the media is usually already processed
+        media = _prepared_media(video_path, start_upload(video_path, video_hash=video_hash, mode=media_mode), media_mode)
+        if _media_failed(media):
+            raise RuntimeError("Gemini could not process the video.")
+        contents = [*media, f"SWING REPORT:\n{report}"]
+        with profiling.timer("gemini.count_tokens"):
+            tokens = client.models.count_tokens(model=model_id, contents=contents).total_tokens
+        if tokens >= minimum:
+            return contents
+        logger.info("%s swing media is %d tokens, under the %d-token cache minimum", media_mode, tokens, minimum)
+    return None
+
+
+def _chat_context(client, model_id, video_path, video_hash, upload_mode, report):
+    """
+    The Gemini context cache for this swing and report: media + instructions + report,
+    created on first use and shared by every later turn until it nears expiry.
+    Returns None when this swing can't be cached; that outcome (or a failed create)
+    is remembered for CONTEXT_CACHE_TTL_SECONDS so later turns skip the attempt.
+    """
+    api_key = st.secrets["GOOGLE_API_KEY"]
+    video_hash = video_hash or _file_sha256(video_path)
+    mode = upload_mode or UPLOAD_MODE
+    key = (api_key, model_id, video_hash, mode, hashlib.sha256(report.encode()).hexdigest())
+
+    _prune_contexts(client)
+    with _lock:
+        entry = _contexts.pop(key, None)
+    if entry is not None:
+        cached = entry[0]
+        if cached.expire_time is None or cached.expire_time - datetime.now(timezone.utc) > EXPIRY_MARGIN:
+            with _lock:
+                _contexts[key] = (cached, time.monotonic())
+            return cached
+        _delete_context(client, cached)  # about to expire; replaced below
+
+    with _lock:
+        failed_at = _context_failures.get(key)
+    if failed_at is not None and time.monotonic() - failed_at < CONTEXT_CACHE_TTL_SECONDS:
+        return None
+
+    cached = None
+    try:
+        contents = _context_media(client, model_id, video_path, video_hash, mode, report)
+        if contents is not None:
+            with profiling.timer("gemini.context_cache"):
+                cached = client.caches.create(
+                    model=model_id,
+                    config=types.CreateCachedContentConfig(
+                        display_name=f"swing-{video_hash[:12]}",
+                        system_instruction=_session_instruction(),
+                        contents=contents,
+                        ttl=f"{CONTEXT_CACHE_TTL_SECONDS}s",
+                    ),
+                )
+    finally:
+        with _lock:
+            if cached is None:
+                _context_failures[key] = time.monotonic()
+            else:
+                _context_failures.pop(key, None)
+                _contexts[key] = (cached, time.monotonic())
+    return cached
+
+
+def _delete_context(client, cached):
+    try:
+        client.caches.delete(name=cached.name)
+    except Exception as e:
+        logger.warning("Couldn't delete context cache %s: %s", cached.name, e)
+
+
+def _prune_contexts(client):
+    """Drops expired context caches and deletes the ones idle for CONTEXT_IDLE_SECONDS."""
+    now, wall_now = time.monotonic(), datetime.now(timezone.utc)
+    idle = []
+    with _lock:
+        for key, (cached, last_used) in list(_contexts.items()):
+            if cached.expire_time is not None and cached.expire_time <= wall_now:
+                del _contexts[key]  # already gone on Gemini's side
+            elif now - last_used > CONTEXT_IDLE_SECONDS:
+                del _contexts[key]
+                idle.append(cached)
+        for key in [k for k, failed_at in _context_failures.items() if now - failed_at >= CONTEXT_CACHE_TTL_SECONDS]:
+            del _context_failures[key]
+    for cached in idle:
+        _delete_context(client, cached)
+
+
+def _first_sentence(text, limit=200):
+    text = " ".join(text.split())
+    end = text.find(". ")
+    return (text[:end + 1] if 0 <= end < limit else text[:limit]).strip()
+
+
+def _history_contents(history):
+    """
+    Bounded chat history: the last CHAT_HISTORY_MESSAGES messages verbatim, plus a
+    short digest (each older question and the gist of its answer) capped at
+    CHAT_SUMMARY_CHARS, so a long chat never grows the per-turn request.
+    """
+    recent = history[-CHAT_HISTORY_MESSAGES:]
+    older = history[:-CHAT_HISTORY_MESSAGES]
+
+    contents = []
+    if older:
+        lines = [
+            f"{'Student' if msg['role'] == 'user' else 'Coach'}: {_first_sentence(msg['content'])}"
+            for msg in older
+        ]
+        digest = "\n".join(lines)[-CHAT_SUMMARY_CHARS:]
+        contents.append(types.Content(role="user", parts=[types.Part.from_text(text=f"Earlier in our chat:\n{digest}")]))
+        contents.append(types.Content(role="model", parts=[types.Part.from_text(text="Got it.")]))
+    for msg in recent:
+        role = "user" if msg["role"] == "user" else "model"
+        contents.append(types.Content(role=role, parts=[types.Part.from_text(text=msg["content"])]))
+    return contents
+
+
+def coach_session_stream(question, previous_report, model_id, video_path, video_hash=None, history=None, upload_mode=None):
+    """
+    Multi-turn coach_chat_stream that can see the swing: runs against the swing's
+    context cache and sends only the new question plus a bounded history
+    (`history` is the earlier chat messages, [{"role", "content"}]).
+    Falls back to report-only coach_chat_stream if caching isn't available
+    (model without caching support, even the full upload below the minimum cache size, ...).
+    """
+    history = history or []
+    video_hash = video_hash or _file_sha256(video_path)
+    upload_mode = upload_mode or UPLOAD_MODE
+    # These answers look at this student's video, not just the (templated) report
+    scope = (video_hash, upload_mode)
+
+    # Definitions don't need the swing (and share the global answer cache)
+    if chat_cache.definition_term(question) is not None:
+        yield from coach_chat_stream(question, previous_report, model_id)
+        return
+
+    # With no history the answer depends only on this swing and report
+    if not history:
+        cached = chat_cache.lookup(model_id, previous_report, question, scope=scope)
+        if cached is not None:
+            profiling.count("gemini.chat_cache_hits")
+            yield cached
+            return
+
+    client = get_client()
+    try:
+        context = _chat_context(client, model_id, video_path, video_hash, upload_mode, previous_report)
+    except Exception as e:
+        profiling.count("gemini.context_cache_errors")
+        logger.warning("No context cache for this swing, answering from the report: %s", e)
+        context = None
+    if context is None:
+        yield from coach_chat_stream(question, previous_report, model_id)
+        return
+
+    turn = types.Content(role="user", parts=[types.Part.from_text(text=question)])
+    parts = []
+    try:
+        for text in _timed_stream(client.models.generate_content_stream(
+            model=model_id,
+            contents=[*_history_contents(history), turn],
+            config=types.GenerateContentConfig(cached_content=context.name),
+        )):
+            parts.append(text)
+            yield text
+    except Exception:
+        profiling.count("gemini.errors")
+        logger.exception("Error calling Gemini")
+        yield CHAT_SNAG_MESSAGE
+        return
 
+    if parts and not history:
+        chat_cache.store(model_id, previous_report, question, "".join(parts), scope=scope)
@@ -0,0 +1,221 @@
+"""
+Headless batch runner for a range session's worth of clips.
+
+    python batch_analyze.py sessions/tuesday/ "extra/*.mov" --out reports/ --workers 8
+
+Each worker process checks one MediaPipe Pose out of its own pool (built on first
+use, reset between clips), extracts the landmark track once per clip and runs the
+requested labs on it. Reports and metrics land in <out>/results.json and
+<out>/results.csv, rendered videos next to them.
+"""
+import os
+import csv
+import glob
+import json
+import hashlib
+import time
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import profiling
+from pose_cache import get_pose_track
+from pose_track import INFERENCE_MODES, INFERENCE_MODE, POSE_TIERS, POSE_TIER, pose_settings, resolve_tier
+from swing_phases import extract_two_pass_track
+from swing_metrics import compute_swing_metrics
+from legacy.swing_analyzer_dev import analyze_foundation_sequence
+from wrist_tracker import drill_coach
+from swing_analyzer import analyze_diagnostic_swing
+
+LABS = ("foundation", "wrist", "xray")
+VIDEO_EXTS = (".mp4", ".mov", ".avi", ".m4v", ".webm")
+CSV_FIELDS = ["video", "status", "seconds", "tier", "frames", "fps", "lag_top", "lag_impact",
+              "top_hinge", "impact_hinge", "head", "hip", "max_head_drift", "max_hip_sway",
+              "peak_wrist_speed", "foundation_video", "wrist_video", "xray_video", "error"]
+
+
+def find_videos(inputs):
+    """Expands folders, globs and plain paths into a sorted, de-duplicated clip list."""
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for name in os.listdir(item):
+                if name.lower().endswith(VIDEO_EXTS):
+                    found.add(os.path.join(item, name))
+        else:
+            for path in glob.glob(item) or [item]:
+                if os.path.isfile(path):
+                    found.add(path)
+    return sorted(found)
+
+
+def _stem(video_path):
+    return os.path.splitext(os.path.basename(video_path))[0]
+
+
+def render_names(videos):
+    """
+    Output name per clip: its file stem, plus a short hash of its path when another
+    clip in the batch has the same stem (tue/swing1.mov and wed/swing1.mov).
+    """
+    counts = {}
+    for video in videos:
+        counts[_stem(video)] = counts.get(_stem(video), 0) + 1
+    names = {}
+    for video in videos:
+        stem = _stem(video)
+        if counts[stem] > 1:
+            stem += "_" + hashlib.sha1(os.path.abspath(video).encode()).hexdigest()[:8]
+        names[video] = stem
+    return names
+
+
+def _video_path(out_dir, name, lab):
+    # Renders are written straight here; no temp file to move afterwards
+    return os.path.join(out_dir, f"{name}_{lab}.mp4")
+
+
+def analyze_one(video_path, labs, club_type, out_dir, mode=None, two_pass=False, render=True, tier=None, name=None):
+    """
+    Runs the requested labs on one clip. Never raises, so one bad file can't sink the batch.
+    Renders are named after `name` (see render_names; defaults to the file stem).
+    """
+    start = time.perf_counter()
+    result = {"video": video_path, "status": "ok"}
+    with profiling.collect() as stats:  # per clip
+        _run_labs(result, video_path, labs, club_type, out_dir, mode, two_pass, render, tier, name or _stem(video_path))
+
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    if profiling.PROFILING:
+        result["timings"] = stats.snapshot()
+    return result
+
+
+def _run_labs(result, video_path, labs, club_type, out_dir, mode, two_pass, render, tier, name):
+    try:
+        # "auto" is resolved per clip, against this machine's load at the time
+        tier = resolve_tier(tier, video_path)
+        result["tier"] = tier
+        if two_pass:
+            track, phases = extract_two_pass_track(video_path, settings=pose_settings(tier))
+            result["phases"] = phases
+        else:
+            track = get_pose_track(video_path, mode=mode, tier=tier)
+        result["frames"] = len(track.landmarks)
+        result["fps"] = track.fps
+        # Lead-arm metrics straight from the landmarks; no rendering needed
+        result.update(compute_swing_metrics(track.landmarks, track.fps)["summary"])
+
+        if "foundation" in labs:
+            report, v_path, lag_top, lag_impact = analyze_foundation_sequence(
+                video_path, track=track, render=render, output_path=_video_path(out_dir, name, "foundation"))
+            result["report"] = report
+            result["lag_top"] = lag_top
+            result["lag_impact"] = lag_impact
+            if render:
+                result["foundation_video"] = v_path
+
+        # The other labs only add videos; their numbers are already in the summary above
+        if render and "wrist" in labs:
+            result["wrist_video"] = drill_coach(video_path, club_type, track=track,
+                                                output_path=_video_path(out_dir, name, "wrist"))
+
+        if render and "xray" in labs:
+            result["xray_video"] = analyze_diagnostic_swing(video_path, club_type, track=track,
+                                                            output_path=_video_path(out_dir, name, "xray"))
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+
+
+def write_results(results, out_dir):
+    with open(os.path.join(out_dir, "results.json"), "w") as f:
+        json.dump(results, f, indent=2, default=str)
+
+    with open(os.path.join(out_dir, "results.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def _named(job, names, video):
+    return job(video, name=names[video])
+
+
+def _run_pool(videos, workers, job):
+    """
+    Yields (video, result) as clips finish; result is the BrokenProcessPool error for
+    clips lost when a worker died outright (a segfault in MediaPipe or FFmpeg on a
+    bad clip), which takes every other in-flight clip down with it.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(job, video): video for video in videos}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except BrokenProcessPool as e:
+                yield futures[future], e
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a folder of swing videos across all cores.")
+    parser.add_argument("inputs", nargs="+", help="Video files, folders or glob patterns")
+    parser.add_argument("--out", default="batch_reports", help="Where reports and videos are written")
+    parser.add_argument("--labs", default=",".join(LABS), help=f"Comma-separated subset of {','.join(LABS)}")
+    parser.add_argument("--club", default="Iron / Wedge", choices=["Iron / Wedge", "Wood / Driver"])
+    parser.add_argument("--mode", default=INFERENCE_MODE, choices=list(INFERENCE_MODES),
+                        help="Pose inference mode: resolution cap and frame stride")
+    parser.add_argument("--tier", default=POSE_TIER, choices=[*POSE_TIERS, "auto"],
+                        help="Pose model: lite/full/heavy, or auto to pick per clip from size and load")
+    parser.add_argument("--two-pass", action="store_true",
+                        help="Scout for the swing first, full-quality inference only around it (ignores --mode)")
+    parser.add_argument("--metrics-only", action="store_true",
+                        help="Skip overlay rendering; write reports and numbers only")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    labs = [lab.strip() for lab in args.labs.split(",") if lab.strip()]
+    unknown = set(labs) - set(LABS)
+    if unknown:
+        parser.error(f"unknown lab(s): {', '.join(sorted(unknown))}")
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        parser.error("no videos found")
+    os.makedirs(args.out, exist_ok=True)
+    names = render_names(videos)
+
+    print(f"🏌️ Analyzing {len(videos)} clip(s) on {args.workers} worker(s)...")
+    job = partial(analyze_one, labs=labs, club_type=args.club, out_dir=args.out, mode=args.mode,
+                  two_pass=args.two_pass, render=not args.metrics_only, tier=args.tier)
+
+    def record(result):
+        results.append(result)
+        print(f"[{len(results)}/{len(videos)}] {result['status']:5} {result['seconds']:7.1f}s  {result['video']}")
+
+    results, lost = [], []
+    try:
+        # analyze_one never raises; only a dead worker process loses clips
+        for video, result in _run_pool(videos, args.workers, partial(_named, job, names)):
+            if isinstance(result, BrokenProcessPool):
+                lost.append(video)
+            else:
+                record(result)
+        # Clips in flight when a worker died: retry each alone, so only the culprit fails
+        for video in lost:
+            (_, result), = _run_pool([video], 1, partial(_named, job, names))
+            if isinstance(result, BrokenProcessPool):
+                result = {"video": video, "status": "error", "seconds": 0.0, "error": "worker process crashed"}
+            record(result)
+    finally:
+        # Whatever finished is written, even if the run is interrupted
+        results.sort(key=lambda r: r["video"])
+        write_results(results, args.out)
+    failed = sum(r["status"] != "ok" for r in results)
+    print(f"✅ Done: {len(results) - failed} ok, {failed} failed -> {args.out}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,326 @@
+"""
+Benchmark for the analysis hot paths on deterministic synthetic swing clips.
+
+    python benchmark.py                  # default clip matrix, stubbed pose backend
+    python benchmark.py --quick          # one small clip, for a smoke test
+    python benchmark.py --real-pose      # real MediaPipe instead of the stub
+    python benchmark.py --out bench.json
+    python benchmark.py --clip a.mov b.mp4   # inference-mode agreement check on real swings
+
+Per clip it reports seconds and frames/sec for each stage (decode, color conversion,
+inference, drawing, H.264 write, legacy mp4v + ffmpeg transcode), end-to-end
+timings for pose extraction and each lab render, and peak RSS, as JSON.
+The stub backend replays a scripted swing so runs are repeatable and measure our
+code rather than the model.
+
+With --clip it instead runs MediaPipe over real swing videos in the "full",
+"balanced" and "fast" inference modes and compares the reported hinge and head/hip
+drift with "full"; the run exits non-zero if a mode is outside HINGE_TOLERANCE_DEG /
+DRIFT_TOLERANCE, or if "full" finds no golfer or no top/impact to compare against.
+(Synthetic stick figures aren't reliably detected by the real model, and the stub
+replays frames in call order, so neither can check strided modes.)
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import platform
+import tempfile
+import subprocess
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from pose_track import POSE_SETTINGS, HINGE_TOLERANCE_DEG, DRIFT_TOLERANCE, extract_pose_track, draw_skeleton
+from swing_metrics import compute_swing_metrics
+from video_writer import H264Writer
+from legacy.swing_analyzer_dev import analyze_foundation_sequence
+from wrist_tracker import drill_coach
+from swing_analyzer import analyze_diagnostic_swing
+
+# (width, height, fps, seconds)
+DEFAULT_CLIPS = [
+    (640, 360, 30, 4),
+    (1280, 720, 60, 3),
+    (1920, 1080, 120, 2),
+    (3840, 2160, 30, 2),
+]
+QUICK_CLIPS = [(640, 360, 30, 2)]
+AGREEMENT_MODES = ["balanced", "fast"]
+
+
+def scripted_landmarks(n_frames):
+    """
+    A (frames, 33, 4) swing: address, backswing to the top, downswing to impact, finish.
+    Deterministic, so stub runs and synthetic clips always agree.
+    """
+    t = np.linspace(0, 1, max(n_frames, 1))
+    # Hands: address 0.62 -> top 0.25 (t=0.45) -> impact 0.64 (t=0.6) -> finish 0.30
+    hand_y = np.interp(t, [0, 0.15, 0.45, 0.6, 0.8, 1], [0.62, 0.60, 0.25, 0.64, 0.30, 0.30])
+    hand_x = np.interp(t, [0, 0.15, 0.45, 0.6, 0.8, 1], [0.50, 0.50, 0.62, 0.50, 0.38, 0.38])
+
+    lm = np.zeros((len(t), 33, 4), dtype=np.float32)
+    lm[:, :, 0], lm[:, :, 1], lm[:, :, 3] = 0.5, 0.5, 1.0
+    lm[:, 0, :2] = (0.50, 0.20)                       # nose
+    lm[:, 11, :2] = (0.45, 0.33)                      # lead shoulder
+    lm[:, 12, :2] = (0.55, 0.33)                      # trail shoulder
+    lm[:, 23, :2] = (0.46, 0.55)                      # hips
+    lm[:, 24, :2] = (0.54, 0.55)
+    for i in (15, 16):                                # wrists together on the grip
+        lm[:, i, 0], lm[:, i, 1] = hand_x, hand_y
+    lm[:, 13, 0] = (lm[:, 11, 0] + hand_x) / 2 - 0.03  # lead elbow, slightly bent
+    lm[:, 13, 1] = (lm[:, 11, 1] + hand_y) / 2
+    lm[:, 14, 0] = (lm[:, 12, 0] + hand_x) / 2 + 0.03
+    lm[:, 14, 1] = (lm[:, 12, 1] + hand_y) / 2
+    return lm
+
+
+class StubPose:
+    """Stands in for mp_pose.Pose: returns the scripted landmarks for each processed frame."""
+
+    def __init__(self, n_frames):
+        self.landmarks = scripted_landmarks(n_frames)
+        self.i = 0
+
+    def process(self, rgb_frame):
+        lm = self.landmarks[min(self.i, len(self.landmarks) - 1)]
+        self.i += 1
+        points = [SimpleNamespace(x=float(p[0]), y=float(p[1]), z=float(p[2]), visibility=float(p[3])) for p in lm]
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=points))
+
+    def reset(self):
+        self.i = 0
+
+    def close(self):
+        pass
+
+
+def make_synthetic_clip(path, width, height, fps, seconds, seed=0):
+    """Renders a textured background with a stick-figure golfer following the scripted swing."""
+    n = int(fps * seconds)
+    rng = np.random.default_rng(seed)
+    background = rng.integers(40, 90, size=(height, width, 3), dtype=np.uint8)
+    lm = scripted_landmarks(n)
+
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for i in range(n):
+        frame = background.copy()
+        draw_skeleton(frame, lm[i], width, height)
+        out.write(frame)
+    out.release()
+    return n
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if platform.system() == "Darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale  # ffmpeg
+    return round(own / 2**20, 1), round(children / 2**20, 1)
+
+
+def bench_stages(path, pose, n_frames):
+    """Times each stage on its own so the numbers don't blur into each other."""
+    t = dict.fromkeys(["decode", "color_convert", "inference", "drawing", "write", "legacy_transcode"], 0.0)
+    landmarks = scripted_landmarks(n_frames)
+
+    cap = cv2.VideoCapture(path)
+    w, h, fps = int(cap.get(3)), int(cap.get(4)), int(cap.get(5))
+    writer = H264Writer(fps, w, h)
+    legacy_tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+    legacy_tmp.close()
+    legacy = cv2.VideoWriter(legacy_tmp.name, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+
+    i = 0
+    while True:
+        s = time.perf_counter()
+        ret, frame = cap.read()
+        t["decode"] += time.perf_counter() - s
+        if not ret: break
+
+        s = time.perf_counter()
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        t["color_convert"] += time.perf_counter() - s
+
+        s = time.perf_counter()
+        pose.process(rgb)
+        t["inference"] += time.perf_counter() - s
+
+        s = time.perf_counter()
+        draw_skeleton(frame, landmarks[min(i, len(landmarks) - 1)], w, h)
+        t["drawing"] += time.perf_counter() - s
+
+        s = time.perf_counter()
+        writer.write(frame)
+        t["write"] += time.perf_counter() - s
+
+        # The pre-H264Writer path: mp4v first, transcoded afterwards
+        s = time.perf_counter()
+        legacy.write(frame)
+        t["legacy_transcode"] += time.perf_counter() - s
+        i += 1
+    cap.release()
+
+    s = time.perf_counter()
+    os.remove(writer.release())
+    t["write"] += time.perf_counter() - s
+
+    s = time.perf_counter()
+    legacy.release()
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        h264 = legacy_tmp.name.replace(".mp4", "_h264.mp4")
+        subprocess.run([ffmpeg, "-y", "-i", legacy_tmp.name, "-c:v", "libx264", "-pix_fmt", "yuv420p", h264],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.remove(h264)
+    t["legacy_transcode"] += time.perf_counter() - s
+    os.remove(legacy_tmp.name)
+
+    return {name: {"seconds": round(sec, 4), "fps": round(i / sec, 1) if sec else None} for name, sec in t.items()}, i
+
+
+def reference_problem(track):
+    """Why a "full" track can't anchor the agreement check, or None if it can."""
+    if np.isnan(track.landmarks[:, 0, 0]).all():
+        return "no golfer detected"
+    summary = compute_swing_metrics(track.landmarks, track.fps)["summary"]
+    if summary["top_hinge"] is None or summary["impact_hinge"] is None:
+        return "no top/impact phase found"
+    return None
+
+
+def mode_agreement(reference, candidate):
+    """How far `candidate`'s reported numbers are from `reference`'s (the "full" track)."""
+    ref = compute_swing_metrics(reference.landmarks, reference.fps)["summary"]
+    cand = compute_swing_metrics(candidate.landmarks, candidate.fps)["summary"]
+
+    def diff(key):
+        if ref[key] is None or cand[key] is None:
+            return None if ref[key] == cand[key] else float("inf")  # one of them missed the phase
+        return round(abs(ref[key] - cand[key]), 4)
+
+    result = {
+        "top_hinge_deg": diff("top_hinge"),
+        "impact_hinge_deg": diff("impact_hinge"),
+        "max_head_drift": diff("max_head_drift"),
+        "max_hip_sway": diff("max_hip_sway"),
+    }
+    hinge_ok = all(d is None or d <= HINGE_TOLERANCE_DEG for d in (result["top_hinge_deg"], result["impact_hinge_deg"]))
+    drift_ok = all(d is None or d <= DRIFT_TOLERANCE for d in (result["max_head_drift"], result["max_hip_sway"]))
+    result["within_tolerance"] = hinge_ok and drift_ok
+    return result
+
+
+def bench_clip(width, height, fps, seconds, real_pose=False, seed=0):
+    workdir = tempfile.mkdtemp(prefix="golf_bench_")
+    path = os.path.join(workdir, f"swing_{width}x{height}_{fps}.mp4")
+    try:
+        n_frames = make_synthetic_clip(path, width, height, fps, seconds, seed)
+
+        def new_pose():
+            if real_pose:
+                import mediapipe as mp
+                return mp.solutions.pose.Pose(**POSE_SETTINGS)
+            return StubPose(n_frames)
+
+        stages, decoded = bench_stages(path, new_pose(), n_frames)
+
+        # End to end, through the real code paths
+        e2e = {}
+        s = time.perf_counter()
+        track = extract_pose_track(path, pose=new_pose(), mode="full")
+        e2e["extract_pose_track"] = time.perf_counter() - s
+
+        for name, run in [
+            ("foundation_render", lambda: analyze_foundation_sequence(path, track=track)[1]),
+            ("wrist_render", lambda: drill_coach(path, "Iron / Wedge", track=track)),
+            ("xray_render", lambda: analyze_diagnostic_swing(path, "Iron / Wedge", track=track)),
+        ]:
+            s = time.perf_counter()
+            os.remove(run())
+            e2e[name] = time.perf_counter() - s
+
+        s = time.perf_counter()
+        analyze_foundation_sequence(path, track=track, render=False)
+        e2e["foundation_metrics_only"] = time.perf_counter() - s
+
+        rss, rss_children = _peak_rss_mb()
+        return {
+            "clip": {"width": width, "height": height, "fps": fps, "seconds": seconds, "frames": decoded},
+            "pose_backend": "mediapipe" if real_pose else "stub",
+            "stages": stages,
+            "end_to_end": {k: {"seconds": round(v, 4), "fps": round(decoded / v, 1) if v else None} for k, v in e2e.items()},
+            "peak_rss_mb": rss,
+            "peak_rss_children_mb": rss_children,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def check_agreement(path):
+    """Mode agreement on one real clip: {"clip", "error" or "modes", "within_tolerance"}."""
+    import mediapipe as mp
+
+    # A fresh graph per mode, so tracking state from one pass can't help the next
+    reference = extract_pose_track(path, pose=mp.solutions.pose.Pose(**POSE_SETTINGS), mode="full")
+    problem = reference_problem(reference)
+    if problem:
+        return {"clip": path, "error": problem, "within_tolerance": False}
+
+    modes = {mode: mode_agreement(reference, extract_pose_track(path, pose=mp.solutions.pose.Pose(**POSE_SETTINGS), mode=mode))
+             for mode in AGREEMENT_MODES}
+    return {"clip": path, "modes": modes, "within_tolerance": all(a["within_tolerance"] for a in modes.values())}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the swing analysis hot paths.")
+    parser.add_argument("--quick", action="store_true", help="One small clip only")
+    parser.add_argument("--real-pose", action="store_true", help="Use MediaPipe instead of the stub backend")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write JSON here instead of stdout")
+    parser.add_argument("--clip", nargs="+", metavar="PATH",
+                        help="Check inference-mode agreement on these real swing videos (MediaPipe) instead")
+    args = parser.parse_args(argv)
+
+    results = {
+        "python": sys.version.split()[0],
+        "opencv": cv2.__version__,
+        "cpus": os.cpu_count(),
+        "ffmpeg": bool(shutil.which("ffmpeg")),
+        # Peak RSS is process-wide and only ever grows: later clips include earlier ones
+        "runs": [],
+    }
+    if args.clip:
+        for path in args.clip:
+            print(f"📐 {path}...", file=sys.stderr)
+            results["runs"].append(check_agreement(path))
+    else:
+        for width, height, fps, seconds in (QUICK_CLIPS if args.quick else DEFAULT_CLIPS):
+            print(f"⏱️  {width}x{height} @ {fps}fps, {seconds}s...", file=sys.stderr)
+            results["runs"].append(bench_clip(width, height, fps, seconds, args.real_pose, args.seed))
+
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if not args.clip:
+        return 0
+    off = [run for run in results["runs"] if not run["within_tolerance"]]
+    for run in off:
+        if "error" in run:
+            print(f"❌ {run['clip']}: nothing to compare against ({run['error']} in full mode)", file=sys.stderr)
+        else:
+            modes = ", ".join(mode for mode, a in run["modes"].items() if not a["within_tolerance"])
+            print(f"❌ {run['clip']}: {modes} disagree with full beyond tolerance", file=sys.stderr)
+    return 1 if off else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
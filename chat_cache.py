@@ -0,0 +1,111 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Answers to a question about one specific report (per model)
+CHAT_CACHE_TTL_SECONDS = float(os.environ.get("GEMINI_CHAT_CACHE_TTL", "3600"))
+CHAT_CACHE_SIZE = int(os.environ.get("GEMINI_CHAT_CACHE_SIZE", "1024"))
+# Report-independent definitions ("what does laid off mean?"), shared by every user
+GLOBAL_CACHE_TTL_SECONDS = float(os.environ.get("GEMINI_GLOBAL_CACHE_TTL", str(7 * 24 * 3600)))
+GLOBAL_CACHE_SIZE = int(os.environ.get("GEMINI_GLOBAL_CACHE_SIZE", "512"))
+
+# Only explicit "what does X mean" forms: a bare "what is the next step" is about
+# the student's swing, and a definition answer is shared with every user.
+_DEFINITION_PATTERNS = [
+    re.compile(r"^what (?:does|do) (?:the (?:term|word|phrase) )?(?P<term>.+?) mean$"),
+    re.compile(r"^what is (?:the )?meaning of (?P<term>.+)$"),
+    re.compile(r"^what is meant by (?P<term>.+)$"),
+    re.compile(r"^(?:define|explain the term|meaning of) (?P<term>.+)$"),
+]
+# Anything pointing at the student's own swing needs the report, not a definition
+_PERSONAL_WORDS = {"i", "me", "my", "mine", "im", "ive", "this", "that", "these", "those", "it", "its",
+                   "wrong", "should", "why", "how", "fix", "better", "worse", "score", "report", "swing"}
+MAX_TERM_WORDS = 4
+
+
+class TTLCache:
+    """Size-bounded LRU whose entries also expire `ttl` seconds after they were stored."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_report_answers = TTLCache(CHAT_CACHE_SIZE, CHAT_CACHE_TTL_SECONDS)
+_definitions = TTLCache(GLOBAL_CACHE_SIZE, GLOBAL_CACHE_TTL_SECONDS)
+
+
+def normalize_question(question):
+    """Case, punctuation and spacing don't make a different question."""
+    q = question.lower().replace("’", "'").replace("'s ", " is ").replace("'", "")
+    q = re.sub(r"[^a-z0-9 ]+", " ", q)
+    return " ".join(q.split())
+
+
+def definition_term(question):
+    """The term a definition-style question asks about (normalized), or None."""
+    q = normalize_question(question)
+    for pattern in _DEFINITION_PATTERNS:
+        m = pattern.match(q)
+        if m:
+            term = m.group("term").strip()
+            words = term.split()
+            if 0 < len(words) <= MAX_TERM_WORDS and not _PERSONAL_WORDS & set(words):
+                return term
+            return None
+    return None
+
+
+def _report_key(model_id, report, question, scope):
+    report_hash = hashlib.sha256((report or "").encode()).hexdigest()
+    return model_id, scope, report_hash, normalize_question(question)
+
+
+def lookup(model_id, report, question, scope=None):
+    """
+    A cached answer for this question, or None. Definitions are shared across reports.
+    `scope` narrows the report tier to answers given with the same extra context
+    (e.g. (video hash, upload mode) when Gemini saw the student's swing).
+    """
+    term = definition_term(question)
+    if term is not None:
+        answer = _definitions.get((model_id, term))
+        if answer is not None:
+            return answer
+    return _report_answers.get(_report_key(model_id, report, question, scope))
+
+
+def store(model_id, report, question, answer, definition=False, scope=None):
+    """Caches an answer; `definition` answers (given without the report) go in the global tier."""
+    term = definition_term(question) if definition else None
+    if term is not None:
+        _definitions.put((model_id, term), answer)
+    else:
+        _report_answers.put(_report_key(model_id, report, question, scope), answer)
@@ -0,0 +1,116 @@
+import os
+import cv2
+import tempfile
+
+from frame_pipeline import FrameReader
+from pose_cache import file_sha256
+from swing_metrics import swing_candidates
+from swing_phases import detect_phases, hands_y, swing_windows, PHASES
+from video_writer import H264Writer
+from workspace import WORK_ROOT
+
+# What the AI coach gets instead of the raw upload (override per deployment via env):
+# the swing window only, longest side capped, frame rate capped, compressed harder
+# than our overlays since Gemini samples the video sparsely anyway.
+PROXY_MAX_SIDE = int(os.environ.get("GEMINI_PROXY_MAX_SIDE", "720"))
+PROXY_FPS = int(os.environ.get("GEMINI_PROXY_FPS", "15"))
+PROXY_CRF = int(os.environ.get("GEMINI_PROXY_CRF", "28"))
+STILL_MAX_SIDE = int(os.environ.get("GEMINI_STILL_MAX_SIDE", "768"))
+STILL_JPEG_QUALITY = 85
+# Keep the follow-through: the proxy runs this long past impact (the swing window stops at +0.5s)
+PROXY_FINISH_SECONDS = float(os.environ.get("GEMINI_PROXY_FINISH_SECONDS", "2.0"))
+
+# Proxies are derived data: cached by content, swept by the workspace janitor
+PROXY_DIR = os.path.join(WORK_ROOT, "proxies")
+
+
+def _scaled_size(width, height, max_side):
+    scale = min(1.0, max_side / max(width, height)) if max_side else 1.0
+    # Even dimensions keep yuv420p happy without padding
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+def _single_swing(video_path, video_hash):
+    """(scout, phases) when the scout pass found exactly one swing, else (scout, None)."""
+    scout, phases = detect_phases(video_path, video_hash=video_hash)
+    # Practice swings make "the swing" a guess; better the whole clip than the wrong one
+    if len(swing_candidates(hands_y(scout.landmarks))) != 1:
+        return scout, None
+    return scout, phases
+
+
+def make_proxy(video_path, video_hash=None, max_side=PROXY_MAX_SIDE, fps=PROXY_FPS, crf=PROXY_CRF):
+    """
+    Trims the clip to the detected swing window (scout pass, see swing_phases)
+    through PROXY_FINISH_SECONDS past impact, downscales and drops frames to at most
+    `fps`, and encodes a compact H.264 proxy. Clips with no swing or more than one
+    candidate (practice swings) are kept whole, just downscaled.
+    Returns its path; the same clip and settings reuse the earlier proxy.
+    """
+    video_hash = video_hash or file_sha256(video_path)
+    path = os.path.join(PROXY_DIR, f"{video_hash[:16]}_{max_side}_{fps}_{crf}.mp4")
+    if os.path.exists(path):
+        os.utime(path)  # keep it off the janitor's stale list
+        return path
+
+    scout, phases = _single_swing(video_path, video_hash)
+    n_frames = len(scout.landmarks)
+    if phases is None:
+        start, stop = 0, n_frames
+    else:
+        (start, stop), = swing_windows(phases, scout.fps, n_frames)
+        end = phases["impact"] if phases["impact"] is not None else phases["transition"]
+        stop = max(stop, min(n_frames, end + int(round(PROXY_FINISH_SECONDS * (scout.fps or 30))) + 1))
+
+    reader = FrameReader(video_path, start=start, stop=stop)
+    src_fps = reader.fps or 30
+    step = max(1, round(src_fps / fps)) if fps else 1
+    size = _scaled_size(reader.width, reader.height, max_side)
+
+    os.makedirs(PROXY_DIR, exist_ok=True)
+    # Unique per writer: another process may be building the same proxy right now
+    fd, tmp_path = tempfile.mkstemp(dir=PROXY_DIR, suffix=".part.mp4")
+    os.close(fd)
+    writer = H264Writer(src_fps / step, *size, path=tmp_path, crf=crf)
+    try:
+        with reader:
+            for i, frame in enumerate(reader):
+                if i % step == 0:
+                    writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+        writer.release()
+    except BaseException:
+        writer.abort()
+        raise
+    os.replace(tmp_path, path)  # complete proxies only, even with concurrent sessions
+    return path
+
+
+def key_frames(video_path, video_hash=None, max_side=STILL_MAX_SIDE):
+    """
+    JPEG stills of the key positions (address, top, transition, impact) found by
+    the scout pass. Returns [(phase, jpeg bytes)] for the phases that were found;
+    none when the clip holds more than one candidate swing.
+    """
+    _, phases = _single_swing(video_path, video_hash)
+    if phases is None:
+        return []
+
+    stills = []
+    cap = cv2.VideoCapture(video_path)
+    try:
+        for name in PHASES:
+            idx = phases[name]
+            if idx is None:
+                continue
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            h, w = frame.shape[:2]
+            frame = cv2.resize(frame, _scaled_size(w, h, max_side), interpolation=cv2.INTER_AREA)
+            ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, STILL_JPEG_QUALITY])
+            if ok:
+                stills.append((name, jpeg.tobytes()))
+    finally:
+        cap.release()
+    return stills
@@ -0,0 +1,205 @@
+import os
+import cv2
+import time
+import queue
+import threading
+
+import profiling
+
+# Frames buffered between stages. Small on purpose: at 4K each frame is ~25 MB,
+# and a full queue is what throttles a fast stage down to the slowest one.
+QUEUE_SIZE = int(os.environ.get("FRAME_QUEUE_SIZE", "8"))
+
+# Progress callbacks fire at most this often (seconds); cancellation is checked every frame
+PROGRESS_INTERVAL = 0.25
+
+_DONE = object()
+
+
+class AnalysisCancelled(Exception):
+    """Raised out of a frame loop once its cancel event is set."""
+
+
+def _put(q, item, stop):
+    """Blocking put (backpressure) that still gives up once the pipeline is shut down."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class FrameReader:
+    """
+    Decoder stage: reads frames on a background thread into a bounded queue.
+    OpenCV releases the GIL while decoding, so this overlaps with inference or
+    drawing on the consuming thread. Iterate it to get BGR frames in order.
+    `start` / `stop` limit decoding to a frame window.
+
+    Constructing one only opens the file (to read its size and fps); the decoder
+    thread starts on `with` or the first iteration. A writer built from those
+    properties can therefore fail before the `with` without stranding a thread
+    that holds the capture and a queue of decoded frames.
+    """
+
+    def __init__(self, video_path, start=0, stop=None, maxsize=QUEUE_SIZE):
+        self.cap = cv2.VideoCapture(video_path)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = int(self.cap.get(cv2.CAP_PROP_FPS))
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if start:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        self.limit = None if stop is None else stop - start
+        # Frames this reader is expected to yield (CAP_PROP_FRAME_COUNT is an estimate; 0 if unknown)
+        remaining = max(0, self.frame_count - start)
+        self.total = remaining if self.limit is None else min(self.limit, remaining or self.limit)
+
+        self._queue = queue.Queue(maxsize)
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = None
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=profiling.bind(self._run), name="frame-decoder", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            n = 0
+            while not self._stop.is_set() and (self.limit is None or n < self.limit):
+                t0 = profiling.start()
+                ret, frame = self.cap.read()
+                profiling.stop("decode", t0)
+                if not ret: break
+                if not _put(self._queue, frame, self._stop):
+                    break
+                n += 1
+        except Exception as e:
+            self._error = e
+        finally:
+            self.cap.release()
+            _put(self._queue, _DONE, self._stop)
+
+    def __iter__(self):
+        self._start()
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield item
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        else:
+            self.cap.release()  # never started
+
+    def __enter__(self):
+        self._start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def monitor(frames, progress=None, cancel=None):
+    """
+    Wraps a FrameReader for the analyzers' frame loops. Raises AnalysisCancelled
+    before the next frame once `cancel` (a threading.Event) is set, and calls
+    progress(done, total, eta_seconds) every PROGRESS_INTERVAL and at the end.
+    `total` is 0 and `eta_seconds` None when the container doesn't report a length.
+    """
+    if progress is None and cancel is None:
+        yield from frames
+        return
+
+    total = frames.total
+    started = last = time.monotonic()
+    done = 0
+    for frame in frames:
+        if cancel is not None and cancel.is_set():
+            raise AnalysisCancelled()
+        yield frame
+        done += 1
+        if progress is not None:
+            now = time.monotonic()
+            if now - last >= PROGRESS_INTERVAL:
+                last = now
+                eta = (now - started) / done * (total - done) if total > done else None
+                progress(done, total, eta)
+    if progress is not None:
+        progress(done, max(total, done), 0.0)
+
+
+class BackgroundWriter:
+    """
+    Encoder stage: wraps a writer (H264Writer / cv2.VideoWriter) so write() only
+    enqueues, and a background thread feeds the encoder. Piping into ffmpeg
+    releases the GIL, so encoding overlaps with drawing the next frame.
+    """
+
+    def __init__(self, writer, maxsize=QUEUE_SIZE):
+        self.writer = writer
+        self._queue = queue.Queue(maxsize)
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=profiling.bind(self._run), name="frame-encoder", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if self._error is None:
+                try:
+                    t0 = profiling.start()
+                    self.writer.write(item)
+                    profiling.stop("encode", t0)
+                except Exception as e:
+                    # Keep draining so the producer never blocks on a dead encoder
+                    self._error = e
+
+    def write(self, frame):
+        if self._error is not None:
+            raise self._error
+        _put(self._queue, frame, self._stop)
+
+    def release(self):
+        """Flushes queued frames, finishes the file and returns the writer's result."""
+        _put(self._queue, _DONE, self._stop)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        with profiling.timer("encode.finish"):
+            return self.writer.release()
+
+    def abort(self):
+        """Stops encoding without finishing the file (analysis failed or was abandoned)."""
+        self._stop.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._queue.put(_DONE)
+        # Kill the encoder first so a write blocked on its pipe fails fast
+        if hasattr(self.writer, "abort"):
+            self.writer.abort()
+        else:
+            self.writer.release()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self.abort()
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import uuid
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+from workspace import WORK_ROOT
+
+# Lab jobs run here instead of inside the Streamlit script run, so reruns (widget
+# changes, chat) never wait on a render and a closed tab doesn't lose the work.
+# Records live under WORK_ROOT, so the workspace janitor also sweeps ones a
+# previous server process left behind.
+JOBS_DIR = os.environ.get("GOLF_JOBS_DIR", os.path.join(WORK_ROOT, "jobs"))
+# Finished jobs are forgotten (in memory and on disk) this long after their last update
+JOB_TTL_SECONDS = float(os.environ.get("GOLF_JOB_TTL_MINUTES", "60")) * 60
+# Threads are enough: decode, MediaPipe and the ffmpeg pipe all release the GIL,
+# and the pose pool already caps concurrent inference.
+JOB_WORKERS = int(os.environ.get("GOLF_JOB_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+
+
+class JobQueue:
+    """
+    Local job queue: submit() returns a job id right away, status() can be polled
+    from any script run (or process) since every state change is written to
+    <jobs_dir>/<id>.json. Results must be JSON-serializable.
+
+    The job function is called as fn(*args, progress=callback, cancel=event, **kwargs):
+    callback(fraction, eta=None) reports 0.0-1.0 completion (and seconds left, if
+    known), and `event` is set by cancel(); pass it to the analyzers, which raise
+    AnalysisCancelled at the next frame.
+    """
+
+    def __init__(self, jobs_dir=JOBS_DIR, max_workers=JOB_WORKERS, ttl=JOB_TTL_SECONDS):
+        self.jobs_dir = jobs_dir
+        os.makedirs(jobs_dir, exist_ok=True)
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lab-job")
+        self._jobs = {}
+        self._cancel = {}
+        self._lock = threading.Lock()
+
+    def _path(self, job_id):
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        # Temp file + rename, so a poller never reads half a record
+        os.makedirs(self.jobs_dir, exist_ok=True)  # the janitor may have removed an idle, empty dir
+        fd, tmp_path = tempfile.mkstemp(dir=self.jobs_dir, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(job, f, default=str)
+        os.replace(tmp_path, self._path(job["id"]))
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields, updated=time.time())
+            self._save(job)
+
+    def _prune(self, now):
+        """Drops finished jobs older than the TTL. Caller holds _lock."""
+        stale = [job_id for job_id, job in self._jobs.items()
+                 if job["status"] not in ACTIVE and now - job["updated"] > self.ttl]
+        for job_id in stale:
+            del self._jobs[job_id]
+            try:
+                os.remove(self._path(job_id))
+            except FileNotFoundError:
+                pass
+
+    def submit(self, fn, *args, kind="job", **kwargs):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        job = {"id": job_id, "kind": kind, "status": QUEUED, "progress": 0, "eta": None,
+               "result": None, "error": None, "created": now, "updated": now}
+        with self._lock:
+            self._prune(now)
+            self._jobs[job_id] = job
+            self._cancel[job_id] = threading.Event()
+            self._save(job)
+        self._pool.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        # Imported here so the app can build its queue without loading cv2 first
+        from frame_pipeline import AnalysisCancelled
+
+        cancel = self._cancel[job_id]
+        try:
+            if cancel.is_set():
+                raise AnalysisCancelled()  # cancelled while still queued
+            self._update(job_id, status=RUNNING)
+            last = [0]
+
+            def progress(fraction, eta=None):
+                pct = int(max(0.0, min(1.0, fraction)) * 100)
+                if pct != last[0]:  # one disk write per percent, not per frame
+                    last[0] = pct
+                    self._update(job_id, progress=pct, eta=None if eta is None else round(eta, 1))
+
+            # Per-job stats, so an analyzer's log_stats() line isn't mixed with other jobs
+            with profiling.collect():
+                result = fn(*args, progress=progress, cancel=cancel, **kwargs)
+        except AnalysisCancelled:
+            self._update(job_id, status=CANCELLED, eta=None)
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=str(e), eta=None)
+        else:
+            self._update(job_id, status=DONE, progress=100, eta=None, result=result)
+        finally:
+            with self._lock:
+                self._cancel.pop(job_id, None)
+
+    def cancel(self, job_id):
+        """Asks a queued or running job to stop; it frees its worker at the next frame."""
+        with self._lock:
+            event = self._cancel.get(job_id)
+        if event is not None:
+            event.set()
+
+    def status(self, job_id):
+        """The job record, or None for an unknown id."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        try:
+            with open(self._path(job_id)) as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if job["status"] in ACTIVE:
+            # Left over from a server that stopped mid-job; nothing is running it now
+            job.update(status=FAILED, error="Interrupted by a server restart.")
+        return job
+
+    def load(self):
+        """Queued + running jobs per worker; above 1.0 new jobs wait for a free worker."""
+        with self._lock:
+            active = sum(job["status"] in ACTIVE for job in self._jobs.values())
+        return active / self.max_workers
+
+    def result(self, job_id):
+        job = self.status(job_id)
+        return job["result"] if job else None
+
+
+def frame_progress(progress, lo=0.0, hi=1.0):
+    """
+    Adapts a job's progress(fraction, eta) callback to the analyzers'
+    progress(done, total, eta), mapping that stage onto [lo, hi] of the job.
+    """
+    def callback(done, total, eta):
+        if total:
+            progress(lo + (hi - lo) * min(done / total, 1.0), eta)
+    return callback
@@ -1,12 +1,56 @@
 import streamlit as st
-import os
 
-from ai_coach import vibe_coach, coach_chat
-from legacy.swing_analyzer_dev import analyze_foundation_sequence
-from wrist_tracker import drill_coach
+# Only light modules up here. cv2, MediaPipe and google-genai are imported where
+# they're first needed (and preloaded by the warm-up thread), so the page renders first.
+from uploads import save_upload, upload_hash as content_hash
+from job_queue import JobQueue, ACTIVE, FAILED, CANCELLED, frame_progress
+from workspace import Workspace, start_janitor
+from warmup import start_warm_up, is_ready
 
 st.set_page_config(page_title="AI Golf Academy", layout="centered")
 
+
+@st.cache_resource
+def get_job_queue():
+    # One queue per server process, shared by every session
+    return JobQueue()
+
+
+@st.cache_resource
+def boot():
+    # Once per server process: load pose models in the background before the first lab click.
+    # Already running (with /ready) when launched as `python warmup.py <app>`; this covers plain `streamlit run`
+    return start_warm_up()
+
+
+def lab_numbers_job(video_path, video_hash, tier, progress, cancel):
+    from pose_cache import get_pose_track
+    from legacy.swing_analyzer_dev import analyze_foundation_sequence
+
+    # Decode + MediaPipe once per swing and tier (cached on disk); every lab and render reuses it
+    track = get_pose_track(video_path, video_hash=video_hash, tier=tier, progress=frame_progress(progress), cancel=cancel)
+    report, _, _, _ = analyze_foundation_sequence(video_path, track=track, render=False)
+    return {"report": report}
+
+
+def lab_render_job(video_path, video_hash, tier, output_path, progress, cancel):
+    from pose_cache import get_pose_track
+    from legacy.swing_analyzer_dev import analyze_foundation_sequence
+
+    # Usually a cache hit by now; if not, extraction is the first 60% of the bar
+    track = get_pose_track(video_path, video_hash=video_hash, tier=tier,
+                           progress=frame_progress(progress, 0.0, 0.6), cancel=cancel)
+    _, v_path, _, _ = analyze_foundation_sequence(video_path, track=track, progress=frame_progress(progress, 0.6, 1.0),
+                                                  cancel=cancel, output_path=output_path)
+    return {"video": v_path}
+
+
+LAB_JOBS = {
+    "xray": "Processing X-Ray Vision...",
+    "wrist": "Analyzing Wrist Hinge...",
+    "render": "Rendering Analysis Video...",
+}
+
 # --- INITIALIZE APP MEMORY ---
 if "coach_report" not in st.session_state:
     st.session_state.coach_report = None
@@ -16,6 +60,39 @@ if "analysis_started" not in st.session_state:
     st.session_state.analysis_started = False
 if "analysis_video" not in st.session_state:
     st.session_state.analysis_video = None  # Unified video storage
+if "render_pending" not in st.session_state:
+    st.session_state.render_pending = False  # Lab numbers shown, overlay video not drawn yet
+if "lab_job" not in st.session_state:
+    st.session_state.lab_job = None  # {"id", "video_hash"} of the lab job running in the background
+if "lab_error" not in st.session_state:
+    st.session_state.lab_error = None
+if "workspace" not in st.session_state:
+    # This session's own directory for its upload and renders; removed when the session ends
+    st.session_state.workspace = Workspace("session")
+
+start_janitor()
+boot()
+jobs = get_job_queue()
+
+
+def submit_lab(fn, *args, kind):
+    # Remember which swing the job is for, so a result for an older upload is never shown as current
+    st.session_state.lab_job = {"id": jobs.submit(fn, *args, kind=kind), "video_hash": st.session_state.video_hash}
+
+
+def abandon_lab_job():
+    # Nobody will look at the result: stop it rather than let it burn a worker to the end
+    if st.session_state.lab_job is not None:
+        jobs.cancel(st.session_state.lab_job["id"])
+        st.session_state.lab_job = None
+
+
+def set_analysis_video(path):
+    # The session holds one reference to its current overlay; replacing it deletes the old file
+    workspace = st.session_state.workspace
+    if st.session_state.analysis_video:
+        workspace.drop(st.session_state.analysis_video)
+    st.session_state.analysis_video = workspace.keep(path) if path else None
 
 # --- SIDEBAR: Coach Settings ---
 st.sidebar.title("⚙️ Coach Settings")
@@ -34,8 +111,39 @@ selected_model_display = st.sidebar.selectbox(
 )
 selected_model_id = MODELS[selected_model_display]
 
+# Pose model tier for the local labs; Auto drops to Lite at peak load instead of queueing
+POSE_MODELS = {
+    "🤖 Auto (Adapts to Clip & Load)": "auto",
+    "🪶 Lite (Fastest)": "lite",
+    "🎯 Full (Balanced)": "full",
+    "🔬 Heavy (Most Accurate)": "heavy",
+}
+
+selected_tier_display = st.sidebar.selectbox(
+    "Pose Model",
+    options=list(POSE_MODELS.keys()),
+    index=0,
+)
+selected_tier = POSE_MODELS[selected_tier_display]
+
+# What the AI coach is sent; smaller media means a faster, cheaper report
+COACH_MEDIA = {
+    "🎯 Swing Only (Trimmed Clip)": "proxy",
+    "🖼️ Key Positions (Stills)": "stills",
+    "🎞️ Full Upload": "full",
+}
+
+selected_media_display = st.sidebar.selectbox(
+    "Video Sent to Coach",
+    options=list(COACH_MEDIA.keys()),
+    index=0,
+)
+selected_media = COACH_MEDIA[selected_media_display]
+
 st.sidebar.divider()
 st.sidebar.info(f"Active Model: {selected_model_display}")
+if not is_ready():
+    st.sidebar.caption("⏳ Pose models are still warming up; the first lab may take a little longer.")
 
 # --- MAIN UI ---
 st.title("🏌️‍♂️ AI Golf Academy")
@@ -50,12 +158,39 @@ uploaded_file = st.file_uploader(
 )
 
 if uploaded_file is not None:
-    video_path = "temp_video.mp4"
-    with open(video_path, "wb") as f:
-        f.write(uploaded_file.read())
+    from ai_coach import vibe_coach_stream, start_upload
+    from pose_track import resolve_tier, server_load
+
+    workspace = st.session_state.workspace
+    # Content hash of the upload: keys the on-disk landmark cache
+    # (hashed in chunks, once per upload)
+    upload_hash = content_hash(uploaded_file, st.session_state)
+
+    # Only (re)write on a new swing, so a background upload never reads a half-written file
+    if st.session_state.get("video_hash") != upload_hash:
+        abandon_lab_job()  # still working on the previous swing
+        # Chunked copy: never builds a second in-memory copy of a big slo-mo clip
+        video_path = save_upload(uploaded_file, workspace.file(f"swing_{upload_hash[:16]}.mp4"))
+        if st.session_state.get("video_path"):
+            workspace.drop(st.session_state.video_path)
+        st.session_state.video_path = workspace.keep(video_path)
+        st.session_state.video_hash = upload_hash
+        # Start the Gemini upload now; it is usually processed by the time the coach is asked
+        start_upload(video_path, video_hash=upload_hash, mode=selected_media)
 
+    video_path = st.session_state.video_path
     st.video(video_path)
 
+    def analysis_tier():
+        # Resolve "auto" once per swing and choice, so the labs and the render share one track
+        key = (upload_hash, selected_tier)
+        cached = st.session_state.get("analysis_tier")
+        if cached is None or cached[0] != key:
+            load = max(server_load(), jobs.load())
+            cached = (key, resolve_tier(selected_tier, video_path, load=load))
+            st.session_state.analysis_tier = cached
+        return cached[1]
+
     st.markdown("### Tell the Coach About the Shot")
     club_type = st.radio("Club Used:", ["Iron / Wedge", "Wood / Driver"], horizontal=True)
 
@@ -71,37 +206,84 @@ if uploaded_file is not None:
 
     # --- 1. AI VIBE COACH ---
     if st.button("💬 Ask AI Vibe Coach", use_container_width=True):
+        streamed = False
         with st.spinner(f"Consulting {selected_model_display}..."):
             try:
                 result_context = f"Club: {club_type}, Shape: {shape}, Contact: {contact}, Direction: {direction}"
-                coach_report = vibe_coach(video_path, result_context, selected_model_id)
+                # Stream the report as it is written instead of waiting for the last token
+                coach_report = st.write_stream(vibe_coach_stream(
+                    video_path, result_context, selected_model_id,
+                    upload=start_upload(video_path, video_hash=upload_hash, mode=selected_media), upload_mode=selected_media,
+                ))
                 st.session_state.coach_report = coach_report
                 st.session_state.analysis_started = True
+                streamed = True
             except Exception as e:
                 st.error(f"Error communicating with AI: {e}")
+        if streamed:
+            # Redraw so the finished report moves into the report/chat area below
+            st.rerun()
+
+    # Labs run on the job queue; this script run only submits and polls
+    busy = st.session_state.lab_job is not None
 
     # --- 2. X-RAY DIAGNOSTIC ---
-    if st.button("🦴 Run X-Ray Diagnostic", use_container_width=True):
-        with st.spinner("Processing X-Ray Vision..."):
-            try:
-                report, v_path, top_h, imp_h = analyze_foundation_sequence(video_path)
-                st.session_state.analysis_video = v_path
-                st.session_state.coach_report = report
-                st.session_state.analysis_started = True
-            except Exception as e:
-                st.error(f"Error processing X-Ray: {e}")
+    if st.button("🦴 Run X-Ray Diagnostic", use_container_width=True, disabled=busy):
+        # Numbers only; the overlay video is rendered on demand below
+        submit_lab(lab_numbers_job, video_path, upload_hash, analysis_tier(), kind="xray")
+        st.rerun()
 
     # --- 3. WRIST LAB ---
-    if st.button("⌚ Run Wrist Lab", use_container_width=True):
-        with st.spinner("Analyzing Wrist Hinge..."):
-            try:
-                # Reusing the dev analyzer which has the best hinge/cone logic
-                report, v_path, top_h, imp_h = analyze_foundation_sequence(video_path)
-                st.session_state.analysis_video = v_path
-                st.session_state.coach_report = report.replace("X-Ray Diagnostic", "Wrist Lab Analysis")
-                st.session_state.analysis_started = True
-            except Exception as e:
-                st.error(f"Error processing Wrist Lab: {e}")
+    if st.button("⌚ Run Wrist Lab", use_container_width=True, disabled=busy):
+        # Reusing the dev analyzer which has the best hinge/cone logic
+        submit_lab(lab_numbers_job, video_path, upload_hash, analysis_tier(), kind="wrist")
+        st.rerun()
+
+    # --- 3b. ON-DEMAND VIDEO ---
+    # The labs return their numbers without drawing a frame; only render when asked to watch
+    if st.session_state.render_pending:
+        if st.button("🎬 Watch Analysis Video", use_container_width=True, disabled=busy):
+            submit_lab(lab_render_job, video_path, upload_hash, analysis_tier(), workspace.new_file(".mp4"), kind="render")
+            st.rerun()
+
+    @st.fragment(run_every=1.0)
+    def lab_job_status():
+        # Reruns on its own every second without touching the rest of the page
+        job = jobs.status(st.session_state.lab_job["id"])
+        if job is not None and job["status"] in ACTIVE:
+            eta = f" (about {int(job['eta']) + 1}s left)" if job["eta"] is not None else ""
+            st.progress(job["progress"], text=LAB_JOBS[job["kind"]] + eta)
+            # Cancelling frees the worker at the next frame instead of finishing an unwanted render
+            if st.button("✖️ Cancel", key="cancel_lab_job"):
+                jobs.cancel(job["id"])
+            return
+
+        if job is not None and job["status"] == CANCELLED:
+            st.toast("Analysis cancelled.")
+        elif st.session_state.lab_job["video_hash"] != st.session_state.get("video_hash"):
+            st.toast("Discarded the analysis of your previous swing.")  # replaced while it ran
+        elif job is None or job["status"] == FAILED:
+            st.session_state.lab_error = job["error"] if job else "the job record is gone."
+        elif job["kind"] == "render":
+            set_analysis_video(job["result"]["video"])
+            st.session_state.render_pending = False
+        else:
+            report = job["result"]["report"]
+            if job["kind"] == "wrist":
+                report = report.replace("X-Ray Diagnostic", "Wrist Lab Analysis")
+            set_analysis_video(None)
+            st.session_state.render_pending = True
+            st.session_state.coach_report = report
+            st.session_state.analysis_started = True
+        st.session_state.lab_job = None
+        st.rerun()  # full rerun so the report, video and chat pick up the result
+
+    if busy:
+        lab_job_status()
+
+    if st.session_state.lab_error:
+        st.error(f"Error processing analysis: {st.session_state.lab_error}")
+        st.session_state.lab_error = None
 
 # --- 4. UNIVERSAL DISPLAY & SAVE ---
 if st.session_state.analysis_video:
@@ -140,21 +322,32 @@ if st.session_state.analysis_started:
             st.markdown(msg["content"])
 
     if user_q := st.chat_input("Ask about your swing:"):
+        from ai_coach import coach_chat_stream, coach_session_stream
+
         st.session_state.chat_messages.append({"role": "user", "content": user_q})
         with st.chat_message("user"):
             st.markdown(user_q)
         
         with st.chat_message("assistant"):
-            with st.spinner("Coach is thinking..."):
-                answer = coach_chat(user_q, st.session_state.coach_report, selected_model_id)
-                st.markdown(answer)
-                st.session_state.chat_messages.append({"role": "assistant", "content": answer})
+            # Tokens render as they arrive, so the first sentence shows up almost immediately
+            # Earlier turns (not this question) ride along, bounded; the swing itself is in Gemini's context cache
+            history = st.session_state.chat_messages[:-1]
+            if st.session_state.get("video_path"):
+                stream = coach_session_stream(user_q, st.session_state.coach_report, selected_model_id,
+                                              st.session_state.video_path, video_hash=st.session_state.video_hash,
+                                              history=history, upload_mode=selected_media)
+            else:
+                stream = coach_chat_stream(user_q, st.session_state.coach_report, selected_model_id)
+            answer = st.write_stream(stream)
+            st.session_state.chat_messages.append({"role": "assistant", "content": answer})
 
 # --- 6. CLEAR SCREEN ---
 st.divider()
 if st.button("🔄 Clear Screen for Next Swing", type="primary", use_container_width=True):
     st.session_state.coach_report = None
     st.session_state.chat_messages = []
-    st.session_state.analysis_video = None
+    set_analysis_video(None)
+    st.session_state.render_pending = False
     st.session_state.analysis_started = False
+    abandon_lab_job()
     st.rerun()
\ No newline at end of file
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+
+_PAINT, _BLEND = "paint", "blend"
+
+
+class StaticOverlay:
+    """
+    Overlay whose geometry is fixed for the whole clip (the address cone, the swing
+    plane line). Shapes are rasterized once, then apply() only touches the pixels
+    they cover: opaque strokes are written by index, translucent fills are blended
+    over their bounding box into preallocated buffers. No per-frame frame.copy()
+    or full-frame addWeighted; the output matches drawing the shapes directly.
+    """
+
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+        self._ops = []
+
+    def _mask(self):
+        return np.zeros((self.height, self.width), dtype=np.uint8)
+
+    def fill_poly(self, pts, color, opacity=1.0):
+        mask = self._mask()
+        cv2.fillPoly(mask, [np.asarray(pts, dtype=np.int32)], 255)
+        self._add(mask, color, opacity)
+        return self
+
+    def line(self, p1, p2, color, thickness=1, opacity=1.0):
+        mask = self._mask()
+        cv2.line(mask, tuple(map(int, p1)), tuple(map(int, p2)), 255, thickness)
+        self._add(mask, color, opacity)
+        return self
+
+    def _add(self, mask, color, opacity):
+        ys, xs = np.nonzero(mask)
+        if len(ys) == 0:
+            return  # entirely off-screen
+        if opacity >= 1.0:
+            self._ops.append((_PAINT, (ys, xs), np.array(color, dtype=np.uint8)))
+            return
+
+        roi = (slice(ys.min(), ys.max() + 1), slice(xs.min(), xs.max() + 1))
+        solid = np.empty(mask[roi].shape + (3,), dtype=np.uint8)
+        solid[:] = color
+        inside = mask[roi].astype(bool)[..., None]
+        self._ops.append((_BLEND, roi, inside, solid, np.empty_like(solid), opacity))
+
+    def apply(self, frame):
+        """Composites every shape onto `frame` in place, in the order they were added."""
+        for op in self._ops:
+            if op[0] == _PAINT:
+                _, (ys, xs), color = op
+                frame[ys, xs] = color
+            else:
+                _, roi, inside, solid, buf, opacity = op
+                region = frame[roi]
+                # Same weights and operand order as cv2.addWeighted(overlay, a, frame, 1 - a)
+                cv2.addWeighted(solid, opacity, region, 1.0 - opacity, 0, dst=buf)
+                np.copyto(region, buf, where=inside)
+        return frame
@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+
+from pose_track import (PoseTrack, INFERENCE_MODES, INFERENCE_MODE, extract_pose_track,
+                        pose_settings, resolve_tier)
+
+# On-disk landmark cache: one .npz per (video bytes, pose settings)
+CACHE_DIR = os.environ.get("POSE_CACHE_DIR", ".pose_cache")
+CACHE_MAX_BYTES = int(os.environ.get("POSE_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hashes a file in chunks so big slo-mo clips never sit in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(video_hash, settings):
+    """Same clip + same Pose parameters -> same key."""
+    blob = json.dumps(settings, sort_keys=True)
+    return hashlib.sha256(f"{video_hash}:{blob}".encode()).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.npz")
+
+
+def load_cached(key):
+    path = _entry_path(key)
+    try:
+        with np.load(path) as data:
+            track = PoseTrack(data["landmarks"], int(data["width"]), int(data["height"]), int(data["fps"]))
+    except (OSError, KeyError, ValueError):
+        return None
+
+    # Touch on hit so eviction is least-recently-used rather than oldest-written
+    os.utime(path)
+    return track
+
+
+def save_cached(key, track):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    # Write to a temp file then rename, so a crashed run never leaves half an entry
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".npz")
+    with os.fdopen(fd, "wb") as f:
+        np.savez(f, landmarks=track.landmarks, width=track.width, height=track.height, fps=track.fps)
+    os.replace(tmp_path, _entry_path(key))
+
+    evict(CACHE_MAX_BYTES)
+
+
+def evict(max_bytes):
+    """Drops least-recently-used entries until the cache fits in max_bytes."""
+    try:
+        names = [n for n in os.listdir(CACHE_DIR) if n.endswith(".npz")]
+    except FileNotFoundError:
+        return
+
+    entries = []
+    for name in names:
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def cached_track(video_path, params, build, video_hash=None):
+    """Loads the track cached for (clip, params), or calls build() and caches the result."""
+    key = cache_key(video_hash or file_sha256(video_path), params)
+
+    track = load_cached(key)
+    if track is None:
+        track = build()
+        save_cached(key, track)
+    return track
+
+
+def get_pose_track(video_path, settings=None, pose=None, video_hash=None, mode=None, progress=None, cancel=None,
+                   tier=None):
+    """
+    Returns the landmark track for a clip, running MediaPipe only on a cache miss.
+    `pose` must have been built with `settings` (defaults to the `tier` model,
+    "auto" allowed; see pose_track.resolve_tier).
+    `progress` / `cancel` only matter on a miss (see frame_pipeline.monitor).
+    """
+    settings = settings or pose_settings(resolve_tier(tier, video_path))
+    mode = mode or INFERENCE_MODE
+    # Downscaled / strided tracks are cached separately from full-quality ones
+    return cached_track(
+        video_path,
+        {**settings, **INFERENCE_MODES[mode]},
+        lambda: extract_pose_track(video_path, pose=pose, settings=settings, mode=mode,
+                                   progress=progress, cancel=cancel),
+        video_hash=video_hash,
+    )
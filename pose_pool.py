@@ -0,0 +1,56 @@
+import os
+import json
+import queue
+import threading
+from contextlib import contextmanager
+
+import mediapipe as mp
+
+mp_pose = mp.solutions.pose
+
+# Max Pose graphs alive per settings per process (one per concurrent analysis)
+POSE_POOL_SIZE = int(os.environ.get("POSE_POOL_SIZE", str(os.cpu_count() or 2)))
+
+
+class PosePool:
+    """
+    Bounded pool of MediaPipe Pose graphs. Each job checks one out, so concurrent
+    sessions never share a tracker, and graphs are reset before every video so no
+    tracking state leaks from one person's swing into the next.
+    """
+
+    def __init__(self, settings, max_size=POSE_POOL_SIZE):
+        self.settings = dict(settings)
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = queue.LifoQueue()  # LIFO keeps the warmest graph in use
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("All pose estimators are busy, try again shortly.")
+        try:
+            try:
+                pose = self._idle.get_nowait()
+            except queue.Empty:
+                # Lazily built: graphs only exist once there is work for them
+                pose = mp_pose.Pose(**self.settings)
+            pose.reset()
+            try:
+                yield pose
+            finally:
+                self._idle.put(pose)
+        finally:
+            self._slots.release()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(settings):
+    """Process-wide pool for a given set of Pose parameters."""
+    key = json.dumps(settings, sort_keys=True)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = PosePool(settings)
+        return _pools[key]
@@ -0,0 +1,243 @@
+import os
+import cv2
+import numpy as np
+import mediapipe as mp
+from collections import namedtuple
+
+import profiling
+from pose_pool import get_pool
+from frame_pipeline import FrameReader, monitor
+
+mp_pose = mp.solutions.pose
+
+# The settings every analyzer was already using, so one track serves them all
+POSE_SETTINGS = {
+    "static_image_mode": False,
+    "model_complexity": 1,
+    "smooth_landmarks": True,
+    "min_detection_confidence": 0.5,
+    "min_tracking_confidence": 0.5,
+}
+
+# --- POSE MODEL TIERS ---
+# Speed/accuracy trade-off, as MediaPipe model_complexity. "auto" picks one per clip
+# from its size and the current server load (see resolve_tier).
+POSE_TIERS = {"lite": 0, "full": 1, "heavy": 2}
+POSE_TIER = os.environ.get("POSE_TIER", "full")
+# Concrete tier wherever there's no clip to resolve "auto" against (pose_settings()
+# default, warm-up readiness): what auto picks for an ordinary clip on a quiet server
+DEFAULT_TIER = POSE_TIER if POSE_TIER in POSE_TIERS else "full"
+# Clips up to this many pixel-frames (about 8s of 1080p30) are cheap enough for "heavy"
+AUTO_HEAVY_MAX_WORK = 1920 * 1080 * 240
+# ... and beyond this (about 10s of 4K30) only "lite" keeps the wait reasonable
+AUTO_LITE_MIN_WORK = 3840 * 2160 * 300
+# Load (busy fraction of the machine) above which auto mode degrades to "lite"
+AUTO_LITE_LOAD = 0.85
+
+# landmarks: float32 array of shape (frames, 33, 4) holding x, y, z, visibility.
+# Frames where MediaPipe found nobody are all-NaN.
+PoseTrack = namedtuple("PoseTrack", ["landmarks", "width", "height", "fps"])
+
+# --- INFERENCE MODES ---
+# max_side: downscale so the longest side is at most this before pose (None = native).
+#   Landmarks are normalized, so they map straight back onto the full-res frame.
+# stride: max frames between inferences while the swing is quiet (address, finish).
+#   Takeaway-to-impact and any fast hand motion are always sampled every frame;
+#   skipped frames are linearly interpolated.
+# Target agreement with "full": hinge within HINGE_TOLERANCE_DEG and head/hip drift
+# within DRIFT_TOLERANCE, well inside the 0.04 / 0.05 PASS/FAIL margins
+# (checked on real clips by `python benchmark.py --clip ...`).
+INFERENCE_MODES = {
+    "full": {"max_side": None, "stride": 1},
+    "balanced": {"max_side": 720, "stride": 2},
+    "fast": {"max_side": 480, "stride": 4},
+    # Fixed-stride, tiny-resolution pass used only to locate the swing (see swing_phases)
+    "scout": {"max_side": 256, "stride": 3, "adaptive": False},
+}
+INFERENCE_MODE = os.environ.get("POSE_INFERENCE_MODE", "full")
+HINGE_TOLERANCE_DEG = 5
+DRIFT_TOLERANCE = 0.01
+
+# Hands moving faster than this (screen heights per second) force dense sampling
+DENSE_WRIST_SPEED = 0.3
+
+
+def pose_settings(tier=None):
+    """POSE_SETTINGS with the model_complexity of a concrete tier (defaults to DEFAULT_TIER)."""
+    tier = tier or DEFAULT_TIER
+    if tier not in POSE_TIERS:
+        raise ValueError(f"Pose tier must be one of {', '.join(POSE_TIERS)}, not {tier!r} "
+                         "(resolve \"auto\" per clip with resolve_tier first)")
+    return {**POSE_SETTINGS, "model_complexity": POSE_TIERS[tier]}
+
+
+def server_load():
+    """1-minute load average per CPU (0 where the OS doesn't report one)."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return 0.0
+
+
+def resolve_tier(tier, video_path, load=None):
+    """
+    Turns "auto" into a concrete tier for this clip; other tiers pass through.
+    Peak load always gets "lite" so users degrade instead of queueing; otherwise
+    the decoded work (pixels x frames) decides, with "heavy" only when the
+    server is quiet. `load` defaults to server_load().
+    """
+    tier = tier or POSE_TIER
+    if tier != "auto":
+        return tier
+
+    load = server_load() if load is None else load
+    if load >= AUTO_LITE_LOAD:
+        return "lite"
+
+    cap = cv2.VideoCapture(video_path)
+    work = cap.get(cv2.CAP_PROP_FRAME_WIDTH) * cap.get(cv2.CAP_PROP_FRAME_HEIGHT) * cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    cap.release()
+    if work >= AUTO_LITE_MIN_WORK:
+        return "lite"
+    if work and work <= AUTO_HEAVY_MAX_WORK and load < AUTO_LITE_LOAD / 2:
+        return "heavy"
+    return "full"
+
+
+def _resize_for_inference(frame, max_side):
+    h, w = frame.shape[:2]
+    scale = max_side / max(h, w) if max_side else 1.0
+    if scale >= 1.0:
+        return frame
+    return cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+def _interpolate_skipped(landmarks, sampled):
+    """Fills frames that were never inferred from the nearest inferred neighbours."""
+    detected = np.flatnonzero(sampled & ~np.isnan(landmarks[:, 0, 0]))
+    skipped = np.flatnonzero(~sampled)
+    if len(detected) == 0 or len(skipped) == 0:
+        return landmarks
+
+    last = detected[-1]
+    if len(detected) > 1:
+        # Inside the detected span; never invent a golfer before one was seen
+        inner = skipped[(skipped > detected[0]) & (skipped < last)]
+        flat = landmarks.reshape(len(landmarks), -1)
+        for col in range(flat.shape[1]):
+            flat[inner, col] = np.interp(inner, detected, flat[detected, col])
+
+    # The stride can skip the clip's last few frames: hold the last pose there
+    # (the finish is still), unless a later inference already saw nobody
+    if not sampled[last + 1:].any():
+        landmarks[last + 1:] = landmarks[last]
+    return landmarks
+
+
+def extract_pose_track(video_path, pose=None, settings=None, mode=None, start=0, stop=None,
+                       progress=None, cancel=None):
+    """
+    Decodes the video once and runs MediaPipe Pose on the frames picked by the
+    inference `mode` (see INFERENCE_MODES; defaults to INFERENCE_MODE).
+    Pass an existing `pose` to reuse it, otherwise one is checked out of the
+    shared pool for `settings` (pose_settings() by default).
+    `start` / `stop` restrict extraction to a frame window; the track then covers
+    only those frames.
+    `progress` / `cancel` are passed to frame_pipeline.monitor.
+    """
+    if pose is None:
+        with get_pool(settings or pose_settings()).acquire() as pooled:
+            return extract_pose_track(video_path, pose=pooled, mode=mode, start=start, stop=stop,
+                                      progress=progress, cancel=cancel)
+
+    opts = INFERENCE_MODES[mode or INFERENCE_MODE]
+    max_side, stride = opts["max_side"], opts["stride"]
+    adaptive = opts.get("adaptive", True)
+
+    # Decoding runs on its own thread; this thread only does resize + inference
+    reader = FrameReader(video_path, start=start, stop=stop)
+    w, h, fps = reader.width, reader.height, reader.fps
+
+    frames, sampled = [], []
+    # Cheap swing-phase state (same thresholds as the analyzers) to keep sampling
+    # dense from takeaway until the hands come back up after impact
+    prev_y, prev_i = None, None
+    addr_y, top_y, bottom_y = None, 1.0, 0.0
+    is_downswing, past_impact = False, False
+    next_infer = 0
+
+    with reader:
+        for i, frame in enumerate(monitor(reader, progress, cancel)):
+            if i < next_infer:
+                # Skipped by the stride: decoded off-thread, never inferred
+                frames.append(None)
+                sampled.append(False)
+                continue
+
+            with profiling.timer("pose.color_convert"):
+                rgb = cv2.cvtColor(_resize_for_inference(frame, max_side), cv2.COLOR_BGR2RGB)
+            with profiling.timer("pose.inference"):
+                res = pose.process(rgb)
+            sampled.append(True)
+
+            step = 1 if adaptive else stride
+            if res.pose_landmarks:
+                pts = [(p.x, p.y, p.z, p.visibility) for p in res.pose_landmarks.landmark]
+                frames.append(pts)
+
+                if adaptive and stride > 1:
+                    wrist_y = (pts[15][1] + pts[16][1]) / 2
+                    if addr_y is None:
+                        addr_y = wrist_y
+                    if not is_downswing:
+                        if wrist_y < top_y: top_y = wrist_y
+                        elif wrist_y > top_y + 0.05: is_downswing = True
+                    elif not past_impact:
+                        if wrist_y > bottom_y: bottom_y = wrist_y
+                        elif wrist_y < bottom_y - 0.02: past_impact = True
+
+                    speed = 0.0
+                    if prev_y is not None:
+                        speed = abs(wrist_y - prev_y) * (fps or 30) / (i - prev_i)
+                    prev_y, prev_i = wrist_y, i
+
+                    in_swing = not past_impact and wrist_y < addr_y - 0.05
+                    if speed < DENSE_WRIST_SPEED and not in_swing:
+                        step = stride
+            else:
+                frames.append(None)
+
+            next_infer = i + step
+
+    landmarks = np.full((len(frames), 33, 4), np.nan, dtype=np.float32)
+    for i, pts in enumerate(frames):
+        if pts is not None:
+            landmarks[i] = pts
+    landmarks = _interpolate_skipped(landmarks, np.array(sampled, dtype=bool))
+    profiling.count("pose.frames_decoded", len(sampled))
+    profiling.count("pose.frames_inferred", sum(sampled))
+
+    return PoseTrack(landmarks, w, h, fps)
+
+
+def frame_landmarks(track, i):
+    """Returns the (33, 4) landmark array for frame i, or None if nobody was detected."""
+    if i >= len(track.landmarks):
+        return None
+    lm = track.landmarks[i]
+    if np.isnan(lm[0, 0]):
+        return None
+    return lm
+
+
+def draw_skeleton(frame, lm, w, h):
+    """Draws the pose skeleton like mp_drawing.draw_landmarks, but from a landmark array."""
+    visible = lm[:, 3] >= 0.5
+    pts = [(int(x * w), int(y * h)) for x, y in lm[:, :2]]
+
+    for a, b in mp_pose.POSE_CONNECTIONS:
+        if visible[a] and visible[b]:
+            cv2.line(frame, pts[a], pts[b], (224, 224, 224), 2)
+    for i, p in enumerate(pts):
+        if visible[i]:
+            cv2.circle(frame, p, 2, (0, 0, 255), 2)
@@ -0,0 +1,252 @@
+"""
+Lightweight stage timers and counters for the analyzers and the AI coach.
+
+Off unless GOLF_PROFILE=1 (or enable() is called). When off, timer() hands back a
+shared no-op context manager and start()/stop() skip the clock entirely, so the
+per-frame cost is one attribute check.
+
+    with profiling.timer("gemini.upload"):
+        ...
+    t0 = profiling.start()
+    ...                                # per-frame work
+    profiling.stop("render.drawing", t0)
+
+Export with snapshot() (dict), log_stats() (one JSON log line), prometheus_text(),
+or serve_metrics(port) for a /metrics endpoint (auto-started when
+GOLF_METRICS_PORT is set). Those are process-wide totals since boot; wrap one
+job in collect() to also get its own stats, which snapshot() and log_stats()
+then report:
+
+    with profiling.collect():
+        ...                            # this job's work, on this thread
+        profiling.log_stats(lab="xray")
+
+Worker threads a job starts only count towards it when their target goes
+through bind().
+"""
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROFILING = os.environ.get("GOLF_PROFILE", "") not in ("", "0")
+
+logger = logging.getLogger("golf.profile")
+
+_timings = {}   # name -> [count, total seconds, max seconds]
+_counters = {}  # name -> count
+_lock = threading.Lock()
+_server = None
+# Per-job collectors (innermost last) that also receive what this context records
+_collectors = contextvars.ContextVar("golf_profile_collectors", default=())
+
+
+def _configure_logger():
+    # Nothing else configures logging (Streamlit leaves the root at WARNING with no
+    # handlers), so give the profile lines their own handler or they're dropped
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def enable(on=True):
+    global PROFILING
+    PROFILING = on
+    if on:
+        _configure_logger()
+
+
+def _add_timing(timings, name, seconds):
+    stat = timings.get(name)
+    if stat is None:
+        timings[name] = [1, seconds, seconds]
+    else:
+        stat[0] += 1
+        stat[1] += seconds
+        if seconds > stat[2]:
+            stat[2] = seconds
+
+
+def record(name, seconds):
+    with _lock:
+        _add_timing(_timings, name, seconds)
+        for stats in _collectors.get():
+            _add_timing(stats.timings, name, seconds)
+
+
+def count(name, n=1):
+    if not PROFILING:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+        for stats in _collectors.get():
+            stats.counters[name] = stats.counters.get(name, 0) + n
+
+
+class Stats:
+    """Timings and counters recorded while one collect() block was active."""
+
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+
+    def snapshot(self):
+        with _lock:
+            return _snapshot(self.timings, self.counters)
+
+
+@contextmanager
+def collect():
+    """Scopes stats to the enclosed job; nests, and the process-wide totals still get everything."""
+    stats = Stats()
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+def bind(fn):
+    """`fn` run in a copy of the caller's context, so a worker thread records into the caller's collect()."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+class _Timer:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.t0)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """Context manager that records how long its block took under `name`."""
+    return _Timer(name) if PROFILING else _NULL_TIMER
+
+
+def start():
+    """Start time for a later stop(); 0.0 when profiling is off."""
+    return time.perf_counter() if PROFILING else 0.0
+
+
+def stop(name, t0):
+    if PROFILING and t0:
+        record(name, time.perf_counter() - t0)
+
+
+def reset():
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+
+
+def _snapshot(timings, counters):
+    return {
+        "timings": {
+            name: {"count": c, "total_s": round(total, 6), "mean_ms": round(1000 * total / c, 3), "max_ms": round(1000 * mx, 3)}
+            for name, (c, total, mx) in sorted(timings.items())
+        },
+        "counters": dict(sorted(counters.items())),
+    }
+
+
+def snapshot():
+    """Stats of the innermost active collect(), or the process-wide totals outside one."""
+    collectors = _collectors.get()
+    if collectors:
+        return collectors[-1].snapshot()
+    with _lock:
+        return _snapshot(_timings, _counters)
+
+
+def log_stats(**context):
+    """Emits the current stats (see snapshot()) as one structured JSON log line."""
+    if PROFILING:
+        logger.info(json.dumps({"event": "golf_profile", **context, **snapshot()}))
+
+
+def _label(name):
+    return name.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def prometheus_text():
+    """Prometheus text exposition format for everything recorded so far."""
+    with _lock:
+        timings = sorted(_timings.items())
+        counters = sorted(_counters.items())
+
+    lines = [
+        "# HELP golf_stage_seconds Time spent per analysis stage.",
+        "# TYPE golf_stage_seconds summary",
+    ]
+    for name, (c, total, _) in timings:
+        lines.append(f'golf_stage_seconds_count{{stage="{_label(name)}"}} {c}')
+        lines.append(f'golf_stage_seconds_sum{{stage="{_label(name)}"}} {total:.6f}')
+    lines += ["# HELP golf_stage_seconds_max Slowest single call per stage.", "# TYPE golf_stage_seconds_max gauge"]
+    for name, (_, _, mx) in timings:
+        lines.append(f'golf_stage_seconds_max{{stage="{_label(name)}"}} {mx:.6f}')
+    lines += ["# HELP golf_events_total Event counters.", "# TYPE golf_events_total counter"]
+    for name, n in counters:
+        lines.append(f'golf_events_total{{name="{_label(name)}"}} {n}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # keep scrapes out of the app logs
+
+
+def serve_metrics(port):
+    """Starts a background /metrics endpoint once per process; later calls are no-ops."""
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+        _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name="golf-metrics", daemon=True).start()
+    return _server
+
+
+if PROFILING:
+    _configure_logger()
+    if os.environ.get("GOLF_METRICS_PORT"):
+        serve_metrics(int(os.environ["GOLF_METRICS_PORT"]))
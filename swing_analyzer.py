@@ -1,97 +1,94 @@
-import os
 import cv2
 import numpy as np
-import tempfile
 import mediapipe as mp
+import profiling
+from pose_track import frame_landmarks, draw_skeleton
+from pose_cache import get_pose_track
+from video_writer import H264Writer
+from frame_pipeline import FrameReader, BackgroundWriter, monitor
+from overlay import StaticOverlay
+from swing_metrics import compute_swing_metrics
 
 # --- BRUTE FORCE IMPORT ---
 # This ignores the 'python.solutions' folder and goes to the root
 mp_pose = mp.solutions.pose
 mp_drawing = mp.solutions.drawing_utils
 
-# Initialize
-pose = mp_pose.Pose(
-    static_image_mode=False,
-    model_complexity=1,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
-
-# Now initialize the pose object using the direct import
-pose = mp_pose.Pose(
-    static_image_mode=False,
-    model_complexity=1,
-    smooth_landmarks=True,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
-
-def analyze_diagnostic_swing(video_path, club_type):
+
+def analyze_diagnostic_swing(video_path, club_type, track=None, render=True, progress=None, cancel=None, output_path=None,
+                             tier=None):
+    """
+    Renders the X-Ray video (stability boxes, address plane, skeleton) and returns its path.
+    With render=False it skips drawing and encoding and returns the swing_metrics summary dict.
+    progress(done, total, eta) is called during extraction (if no track) and again while
+    rendering; setting `cancel` aborts with AnalysisCancelled.
+    The video is written to `output_path` (a workspace scratch file by default).
+    `tier` picks the pose model (lite/full/heavy/auto) when no track is passed.
+    """
     print("🦴 Booting up the X-Ray Diagnostic Lab...")
-    cap = cv2.VideoCapture(video_path)
+    # Pose inference runs once per swing; pass a shared track to skip it entirely
+    if track is None:
+        track = get_pose_track(video_path, progress=progress, cancel=cancel, tier=tier)
+
+    # Metrics-only fast path: numbers straight from the landmarks, no video
+    if not render:
+        return compute_swing_metrics(track.landmarks, track.fps)["summary"]
+
+    # Decode on one thread, draw here, encode on another (bounded queues between them)
+    frames = FrameReader(video_path)
     
     # Get video properties
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    width, height, fps = frames.width, frames.height, frames.fps
     
-    # Create temp file for output
-    # Use MP4 container with the universal mp4v codec
-    tfile = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(tfile.name, fourcc, fps, (width, height))
+    # Frames go straight into a single browser-friendly H.264 encode
+    out = BackgroundWriter(H264Writer(fps, width, height, path=output_path))
 
     address_plane_drawn = False
     plane_line = None
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret: break
-
-        # Convert to RGB for MediaPipe
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = pose.process(rgb_frame)
-
-        if results.pose_landmarks:
-            landmarks = results.pose_landmarks.landmark
-            
-            # --- 1. SETUP SHAFT PLANE (ADDRESS) ---
-            if not address_plane_drawn:
-                # Hip to Hand line
-                hip = landmarks[mp_pose.PoseLandmark.RIGHT_HIP]
-                hand = landmarks[mp_pose.PoseLandmark.RIGHT_WRIST]
-                plane_line = (
-                    (int(hip.x * width), int(hip.y * height)),
-                    (int(hand.x * width), int(hand.y * height))
-                )
-                address_plane_drawn = True
-
-            # --- 2. DRAW STABILITY BOXES ---
-            # Hip Box
-            rh = landmarks[mp_pose.PoseLandmark.RIGHT_HIP]
-            cv2.rectangle(frame, (int(rh.x*width)-40, int(rh.y*height)-40), 
-                          (int(rh.x*width)+40, int(rh.y*height)+40), (255, 255, 0), 2)
+    frame_idx = 0
+    with frames, out:
+        for frame in monitor(frames, progress, cancel):
+            landmarks = frame_landmarks(track, frame_idx)
+            frame_idx += 1
+            t0 = profiling.start()
+
+            if landmarks is not None:
+                # --- 1. SETUP SHAFT PLANE (ADDRESS) ---
+                if not address_plane_drawn:
+                    # Hip to Hand line
+                    hip = landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value]
+                    hand = landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value]
+                    plane_line = StaticOverlay(width, height).line(
+                        (int(hip[0] * width), int(hip[1] * height)),
+                        (int(hand[0] * width), int(hand[1] * height)),
+                        (0, 165, 255), 3,
+                    )
+                    address_plane_drawn = True
+
+                # --- 2. DRAW STABILITY BOXES ---
+                # Hip Box
+                rh = landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value]
+                cv2.rectangle(frame, (int(rh[0]*width)-40, int(rh[1]*height)-40), 
+                              (int(rh[0]*width)+40, int(rh[1]*height)+40), (255, 255, 0), 2)
             
-            # Head Box
-            nose = landmarks[mp_pose.PoseLandmark.NOSE]
-            cv2.rectangle(frame, (int(nose.x*width)-30, int(nose.y*height)-30), 
-                          (int(nose.x*width)+30, int(nose.y*height)+30), (0, 255, 255), 2)
-
-            # --- 3. DRAW PLANE LINE ---
-            if plane_line:
-                cv2.line(frame, plane_line[0], plane_line[1], (0, 165, 255), 3)
+                # Head Box
+                nose = landmarks[mp_pose.PoseLandmark.NOSE.value]
+                cv2.rectangle(frame, (int(nose[0]*width)-30, int(nose[1]*height)-30), 
+                              (int(nose[0]*width)+30, int(nose[1]*height)+30), (0, 255, 255), 2)
 
-            # --- 4. DRAW SKELETON ---
-            mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+                # --- 3. DRAW PLANE LINE ---
+                if plane_line is not None:
+                    plane_line.apply(frame)
 
-        out.write(frame)
+                # --- 4. DRAW SKELETON ---
+                draw_skeleton(frame, landmarks, width, height)
 
-    cap.release()
-    out.release()
+            profiling.stop("render.xray.drawing", t0)
+            out.write(frame)
 
-    # The Universal Translator: Convert OpenCV's mp4v into a browser-friendly H.264 MP4
-    final_video_path = tfile.name.replace('.mp4', '_h264.mp4')
-    os.system(f"ffmpeg -y -i {tfile.name} -vcodec libx264 {final_video_path}")
+    final_video_path = out.release()
+    profiling.log_stats(lab="xray", video=video_path)
 
     return final_video_path
 
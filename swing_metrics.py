@@ -0,0 +1,180 @@
+import numpy as np
+
+# MediaPipe landmark indices (right-handed golfer: left side is the lead side)
+NOSE = 0
+LEAD_SHOULDER, LEAD_ELBOW, LEAD_WRIST = 11, 13, 15
+TRAIL_WRIST = 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+
+# Same PASS/FAIL margins the X-Ray has always used (normalized screen units)
+HEAD_TOLERANCE = 0.04
+HIP_TOLERANCE = 0.05
+
+# Pure NumPy like the rest of this module: segmenting a track needs no cv2 / MediaPipe
+PHASES = ("address", "top", "transition", "impact")
+# Hands dropping at least this fraction of the fastest downswing's peak speed count as a
+# swing too (a practice swing); lowering the club after the finish is far slower
+CANDIDATE_SPEED_RATIO = 0.5
+
+
+def _next_swing(y, start):
+    """Phases of the first top -> drop -> bottom at or after frame `start` (absolute indices)."""
+    phases = dict.fromkeys(PHASES)
+    seg = y[start:]
+    if not np.any(~np.isnan(seg)):
+        return phases
+
+    run_min = np.fmin.accumulate(np.where(np.isnan(seg), np.inf, seg))
+    dropping = np.flatnonzero(seg > run_min + 0.05)
+    if len(dropping) == 0:
+        return phases
+
+    transition = int(dropping[0])
+    top = int(np.nanargmin(seg[:transition + 1]))
+    phases["top"], phases["transition"] = start + top, start + transition
+
+    pre = seg[:top + 1]
+    low = np.nanmax(pre)
+    phases["address"] = start + int(np.flatnonzero(pre >= low - 0.02)[-1])
+
+    down = seg[transition:]
+    run_max = np.fmax.accumulate(np.where(np.isnan(down), -np.inf, down))
+    rising = np.flatnonzero(down < run_max - 0.02)
+    end = int(rising[0]) if len(rising) else len(down)
+    if end > 0 and np.any(~np.isnan(down[:end])):
+        phases["impact"] = start + transition + int(np.nanargmax(down[:end]))
+
+    return phases
+
+
+def _downswing_speed(y, phases):
+    # Fastest frame-to-frame drop of the hands between top and impact
+    if phases["impact"] is None or phases["impact"] <= phases["top"]:
+        return 0.0
+    steps = np.diff(y[phases["top"]:phases["impact"] + 1])
+    return float(np.nanmax(steps)) if np.any(~np.isnan(steps)) else 0.0
+
+
+def swing_candidates(wrist_y):
+    """
+    Every swing-like motion in a wrist height series, in clip order, as
+    (phases, peak downswing speed) pairs. Motions slower than
+    CANDIDATE_SPEED_RATIO of the fastest (lowering the club after the finish)
+    are left out, so more than one candidate means practice swings.
+    """
+    y = np.asarray(wrist_y, dtype=np.float64)
+    found, start = [], 0
+    while start < len(y):
+        phases = _next_swing(y, start)
+        if phases["transition"] is None:
+            break
+        found.append((phases, _downswing_speed(y, phases)))
+        start = (phases["impact"] if phases["impact"] is not None else phases["transition"]) + 1
+
+    if not found:
+        return []
+    fastest = max(speed for _, speed in found)
+    return [(phases, speed) for phases, speed in found if speed >= CANDIDATE_SPEED_RATIO * fastest]
+
+
+def segment_swing(wrist_y):
+    """
+    Finds swing phases in a per-frame wrist height series (normalized y, NaN = no golfer),
+    using the same thresholds as the analyzers' online state machines:
+      top        - highest hands before they drop 0.05 below it
+      transition - first frame the drop is detected (where the analyzers read top hinge)
+      impact     - lowest hands in the downswing, before they rise 0.02 again
+      address    - last frame before the top with the hands at their pre-swing low
+    A clip with a pre-shot routine can hold several such motions; the one with
+    the fastest downswing is the swing (see swing_candidates).
+    Returns {phase: frame index or None}.
+    """
+    candidates = swing_candidates(wrist_y)
+    if not candidates:
+        return dict.fromkeys(PHASES)
+    return max(candidates, key=lambda c: c[1])[0]
+
+
+def joint_angles(a, b, c):
+    """Angle at b (degrees, 0-180) for every frame; a, b, c are (frames, 2) arrays of x, y."""
+    radians = np.arctan2(c[:, 1] - b[:, 1], c[:, 0] - b[:, 0]) - np.arctan2(a[:, 1] - b[:, 1], a[:, 0] - b[:, 0])
+    angle = np.abs(np.degrees(radians))
+    return np.where(angle > 180.0, 360.0 - angle, angle)
+
+
+def _first_detected(landmarks):
+    found = np.flatnonzero(~np.isnan(landmarks[:, NOSE, 0]))
+    return int(found[0]) if len(found) else None
+
+
+def compute_swing_metrics(landmarks, fps, phase_wrist=LEAD_WRIST,
+                          head_tolerance=HEAD_TOLERANCE, hip_tolerance=HIP_TOLERANCE):
+    """
+    All swing metrics for a whole (frames, 33, 4) landmark track in one vectorized pass.
+    `phase_wrist` is the wrist whose height drives top/impact detection.
+    Returns {"series": per-frame arrays, "phases": frame indices, "reference": the
+    address frame drift/sway are measured from, "summary": headline values}.
+    Frames with no golfer are NaN in every series.
+    """
+    fps = fps or 30
+    lm = np.asarray(landmarks, dtype=np.float64)
+    xy = lm[:, :, :2]
+
+    hinge = joint_angles(xy[:, LEAD_SHOULDER], xy[:, LEAD_ELBOW], xy[:, LEAD_WRIST])
+    wrist_y = xy[:, phase_wrist, 1]
+    mid_hip_x = (xy[:, LEFT_HIP, 0] + xy[:, RIGHT_HIP, 0]) / 2
+
+    phases = segment_swing(wrist_y)
+    top, impact = phases["transition"], phases["impact"]
+
+    # Stability is measured against the address frame (falling back to the first frame
+    # the golfer is seen), not a walk-in or, on a two-pass track, a scout-only frame
+    addr = phases["address"]
+    if addr is None or np.isnan(xy[addr, NOSE, 1]):
+        addr = _first_detected(lm)
+    if addr is None:
+        head_drift = hip_sway = np.full(len(lm), np.nan)
+    else:
+        head_drift = xy[:, NOSE, 1] - xy[addr, NOSE, 1]
+        hip_sway = mid_hip_x - mid_hip_x[addr]
+
+    if len(lm) > 1:
+        wrist_speed = np.linalg.norm(np.gradient(xy[:, phase_wrist], axis=0), axis=1) * fps
+        hinge_velocity = np.gradient(hinge) * fps
+    else:
+        wrist_speed = hinge_velocity = np.zeros(len(lm))
+
+    with np.errstate(invalid="ignore"):
+        head_stable = np.abs(head_drift) < head_tolerance
+        hip_stable = np.abs(hip_sway) < hip_tolerance
+
+    # PASS/FAIL reflects the last frame the golfer was seen, as the X-Ray report always has
+    detected = np.flatnonzero(~np.isnan(head_drift))
+    last = int(detected[-1]) if len(detected) else None
+
+    summary = {
+        "top_hinge": int(hinge[top]) if top is not None else None,
+        "impact_hinge": int(hinge[impact]) if impact is not None else None,
+        "head": "PASS" if last is None or head_stable[last] else "FAIL",
+        "hip": "PASS" if last is None or hip_stable[last] else "FAIL",
+        # From address on; walking in to the ball isn't drift
+        "max_head_drift": float(np.nanmax(np.abs(head_drift[addr:]))) if last is not None else None,
+        "max_hip_sway": float(np.nanmax(np.abs(hip_sway[addr:]))) if last is not None else None,
+        "peak_wrist_speed": float(np.nanmax(wrist_speed)) if len(detected) > 1 else None,
+    }
+
+    return {
+        "series": {
+            "hinge": hinge,
+            "hinge_velocity": hinge_velocity,
+            "wrist_y": wrist_y,
+            "wrist_speed": wrist_speed,
+            "head_drift": head_drift,
+            "hip_sway": hip_sway,
+            "head_stable": head_stable,
+            "hip_stable": hip_stable,
+        },
+        "phases": phases,
+        "reference": addr,  # frame drift and sway are measured from
+        "summary": summary,
+    }
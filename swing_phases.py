@@ -0,0 +1,66 @@
+from swing_metrics import PHASES, segment_swing
+from pose_track import POSE_SETTINGS, PoseTrack, extract_pose_track, pose_settings, resolve_tier
+from pose_cache import cached_track, get_pose_track, file_sha256
+
+# The scout pass: lite model on tiny, strided frames. Only used to find the swing.
+SCOUT_SETTINGS = {**POSE_SETTINGS, "model_complexity": 0}
+
+# Full-quality inference covers address -> impact plus this much either side
+WINDOW_PAD_SECONDS = 0.5
+
+def hands_y(landmarks):
+    """Mean height of both wrists per frame; hands stay together on the grip."""
+    return (landmarks[:, 15, 1] + landmarks[:, 16, 1]) / 2
+
+
+def phase_timestamps(phases, fps):
+    """Structured phase data: {phase: {"frame": i, "seconds": t}} (None if not found)."""
+    fps = fps or 30
+    return {
+        name: None if idx is None else {"frame": idx, "seconds": round(idx / fps, 3)}
+        for name, idx in phases.items()
+    }
+
+
+def detect_phases(video_path, video_hash=None):
+    """Cheap scout pass only. Returns (scout track, phase frame indices)."""
+    scout = get_pose_track(video_path, settings=SCOUT_SETTINGS, mode="scout", video_hash=video_hash)
+    return scout, segment_swing(hands_y(scout.landmarks))
+
+
+def swing_windows(phases, fps, n_frames, pad_seconds=WINDOW_PAD_SECONDS):
+    """Frame windows that get full-quality inference: address through impact, padded."""
+    if phases["top"] is None:
+        return [(0, n_frames)]  # Couldn't find a swing: don't guess, analyze everything
+
+    pad = int(round(pad_seconds * (fps or 30)))
+    first = phases["address"] if phases["address"] is not None else phases["top"]
+    last = phases["impact"] if phases["impact"] is not None else phases["transition"]
+    return [(max(0, first - pad), min(n_frames, last + pad + 1))]
+
+
+def extract_two_pass_track(video_path, settings=None, video_hash=None):
+    """
+    Scout pass to find the swing, then full-quality inference only inside the swing
+    window. Frames outside it (pre-shot routine, finish) keep their scout landmarks.
+    Returns (track, phases) where phases come from phase_timestamps.
+    `settings` defaults to the POSE_TIER model ("auto" resolved for this clip).
+    """
+    video_hash = video_hash or file_sha256(video_path)
+    settings = settings or pose_settings(resolve_tier(None, video_path))
+    scout, scout_phases = detect_phases(video_path, video_hash=video_hash)
+    windows = swing_windows(scout_phases, scout.fps, len(scout.landmarks))
+
+    def build():
+        landmarks = scout.landmarks.copy()
+        for start, stop in windows:
+            part = extract_pose_track(video_path, settings=settings, mode="full", start=start, stop=stop)
+            landmarks[start:start + len(part.landmarks)] = part.landmarks
+        return PoseTrack(landmarks, scout.width, scout.height, scout.fps)
+
+    params = {**(settings or pose_settings()), "two_pass": windows}
+    track = cached_track(video_path, params, build, video_hash=video_hash)
+
+    # Re-segment on the refined landmarks for the reported timestamps
+    phases = segment_swing(hands_y(track.landmarks))
+    return track, phase_timestamps(phases, track.fps)
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chat_cache  # noqa: E402
+
+
+@pytest.mark.parametrize("question, term", [
+    ("What does laid off mean?", "laid off"),
+    ("what do lag and release mean", "lag and release"),
+    ("What does the term early extension mean?", "early extension"),
+    ("What's the meaning of casting?", "casting"),
+    ("What is meant by shallowing", "shallowing"),
+    ("Define over the top", "over the top"),
+    ("meaning of X-factor", "x factor"),
+])
+def test_definition_questions(question, term):
+    assert chat_cache.definition_term(question) == term
+
+
+@pytest.mark.parametrize("question", [
+    "What is the biggest flaw here",
+    "what is the next step",
+    "What is a good drill for casting?",
+    "What are my priorities?",
+    "What does my hip score mean?",
+    "What does this mean",
+    "Why is my head moving?",
+    "What does a really long description of a swing fault mean",
+])
+def test_personal_questions_are_not_definitions(question):
+    assert chat_cache.definition_term(question) is None
+
+
+def test_definitions_shared_across_reports():
+    chat_cache.store("m", "Head: PASS", "What does laid off mean?", "A definition", definition=True)
+    assert chat_cache.lookup("m", "Head: FAIL", "what does laid off mean") == "A definition"
+
+
+def test_report_answers_stay_with_their_report():
+    chat_cache.store("m", "Head: PASS", "What is the next step?", "Work on the hip")
+    assert chat_cache.lookup("m", "Head: PASS", "what is the next step") == "Work on the hip"
+    assert chat_cache.lookup("m", "Head: FAIL", "what is the next step") is None
+
+
+def test_scoped_answers_stay_with_their_swing():
+    chat_cache.store("m", "Head: PASS", "Is my grip ok?", "Grip looks strong", scope=("swing-a", "proxy"))
+    assert chat_cache.lookup("m", "Head: PASS", "is my grip ok", scope=("swing-a", "proxy")) == "Grip looks strong"
+    assert chat_cache.lookup("m", "Head: PASS", "is my grip ok", scope=("swing-b", "proxy")) is None
+    assert chat_cache.lookup("m", "Head: PASS", "is my grip ok") is None
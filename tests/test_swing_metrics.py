@@ -0,0 +1,120 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from swing_metrics import (  # noqa: E402
+    LEAD_SHOULDER, LEAD_ELBOW, LEAD_WRIST, compute_swing_metrics, joint_angles, segment_swing, swing_candidates,
+)
+
+
+def scripted_track(n_frames, keys, hands, elbow_bend=0.03, missing=()):
+    """(frames, 33, 4) track whose hands follow `hands` (y at the `keys` times, 0-1)."""
+    t = np.linspace(0, 1, n_frames)
+    hand_y = np.interp(t, keys, hands)
+    hand_x = 0.5 + 0.3 * (0.62 - hand_y)
+
+    lm = np.zeros((n_frames, 33, 4), dtype=np.float32)
+    lm[:, :, 0], lm[:, :, 1], lm[:, :, 3] = 0.5, 0.5, 1.0
+    lm[:, 0, :2] = (0.50, 0.20)
+    lm[:, LEAD_SHOULDER, :2] = (0.45, 0.33)
+    lm[:, 23, :2], lm[:, 24, :2] = (0.46, 0.55), (0.54, 0.55)
+    lm[:, 15, 0], lm[:, 15, 1] = hand_x, hand_y
+    lm[:, 16, 0], lm[:, 16, 1] = hand_x, hand_y
+    # Elbow bend varies through the swing, so the hinge differs frame to frame
+    lm[:, LEAD_ELBOW, 0] = (0.45 + hand_x) / 2 - elbow_bend * (1 + np.sin(6 * t))
+    lm[:, LEAD_ELBOW, 1] = (0.33 + hand_y) / 2
+    lm[list(missing)] = np.nan
+    return lm
+
+
+def online_hinges(landmarks):
+    """The per-frame state machine the Wrist Lab used before swing_metrics (lead wrist)."""
+    is_downswing, impact_locked = False, False
+    top_wrist_y, down_max_wrist_y = 1.0, 0.0
+    lag_top = lag_impact = None
+    for lm in landmarks:
+        if np.isnan(lm[0, 0]):
+            continue  # nobody detected
+        angle = joint_angles(lm[None, LEAD_SHOULDER, :2], lm[None, LEAD_ELBOW, :2], lm[None, LEAD_WRIST, :2])[0]
+        wrist_y = lm[LEAD_WRIST, 1]
+        if not is_downswing:
+            if wrist_y < top_wrist_y:
+                top_wrist_y = wrist_y
+            elif wrist_y > top_wrist_y + 0.05:
+                is_downswing = True
+        if is_downswing and lag_top is None:
+            lag_top = int(angle)
+        if is_downswing and not impact_locked:
+            if wrist_y > down_max_wrist_y:
+                down_max_wrist_y = wrist_y
+                lag_impact = int(angle)
+            elif wrist_y < down_max_wrist_y - 0.02:
+                impact_locked = True
+    return lag_top, lag_impact
+
+
+SWING_KEYS = [0, 0.15, 0.45, 0.6, 0.8, 1]
+SWING_HANDS = [0.62, 0.60, 0.25, 0.64, 0.30, 0.30]
+
+
+@pytest.mark.parametrize("n_frames, kwargs", [
+    (120, {}),
+    (240, {}),
+    (90, {"elbow_bend": 0.06}),
+    (180, {"missing": range(0, 10)}),          # golfer walks into frame
+    (180, {"missing": [70, 71, 95, 130]}),     # dropped detections mid-swing
+])
+def test_hinges_match_the_online_state_machine(n_frames, kwargs):
+    lm = scripted_track(n_frames, SWING_KEYS, SWING_HANDS, **kwargs)
+    summary = compute_swing_metrics(lm, 30, phase_wrist=LEAD_WRIST)["summary"]
+    assert (summary["top_hinge"], summary["impact_hinge"]) == online_hinges(lm)
+
+
+def test_segment_swing_phases_in_order():
+    lm = scripted_track(150, SWING_KEYS, SWING_HANDS)
+    phases = segment_swing(lm[:, LEAD_WRIST, 1])
+    assert phases["address"] < phases["top"] < phases["transition"] < phases["impact"]
+    assert lm[phases["top"], LEAD_WRIST, 1] == pytest.approx(0.25, abs=0.01)
+    assert lm[phases["impact"], LEAD_WRIST, 1] == pytest.approx(0.64, abs=0.01)
+
+
+def test_no_swing_no_phases():
+    assert segment_swing(np.full(50, 0.6)) == dict.fromkeys(["address", "top", "transition", "impact"])
+    assert segment_swing(np.full(50, np.nan))["top"] is None
+
+
+def wrist_series(points, n_frames):
+    """Piecewise-linear hand height through (frame, y) points."""
+    frames, ys = zip(*points)
+    return np.interp(np.arange(n_frames), frames, ys)
+
+
+# A practice swing (top at 70), then the real, faster one (top at 190, impact at 198),
+# then the club is lowered slowly after the finish
+ROUTINE = [(0, 0.62), (30, 0.62), (70, 0.35), (80, 0.62), (150, 0.62),
+           (190, 0.25), (198, 0.64), (215, 0.30), (230, 0.30), (270, 0.62), (299, 0.62)]
+
+
+def test_practice_swing_is_not_the_swing():
+    phases = segment_swing(wrist_series(ROUTINE, 300))
+    assert phases["top"] == 190
+    assert phases["impact"] == 198
+    assert 150 <= phases["address"] < 190
+
+
+def test_candidates_count_practice_swings_but_not_lowering_the_club():
+    assert len(swing_candidates(wrist_series(ROUTINE, 300))) == 2
+    assert len(swing_candidates(wrist_series(ROUTINE[3:], 300))) == 1
+
+
+def test_stability_measured_from_address_not_walk_in():
+    lm = scripted_track(180, SWING_KEYS, SWING_HANDS)
+    lm[:15, 0, 1] = 0.35  # head lower while walking in, before address
+    metrics = compute_swing_metrics(lm, 30)
+    assert metrics["reference"] >= 15
+    assert metrics["summary"]["head"] == "PASS"
+    assert metrics["summary"]["max_head_drift"] == pytest.approx(0.0, abs=1e-6)
@@ -0,0 +1,50 @@
+import os
+import shutil
+import hashlib
+import tempfile
+
+# Uploads are hashed and copied in pieces this size, so no extra full-clip copies
+# are made on top of the buffer Streamlit already holds.
+CHUNK_SIZE = 1024 * 1024
+
+
+def stream_sha256(fileobj, chunk_size=CHUNK_SIZE):
+    """SHA-256 of a file-like object (e.g. st.file_uploader's result), read in chunks."""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def save_upload(fileobj, path, chunk_size=CHUNK_SIZE):
+    """
+    Copies an upload to `path` chunk by chunk. Goes through a temp file and a
+    rename, so readers (a background Gemini upload, a lab job) never see half a clip.
+    """
+    fileobj.seek(0)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(fileobj, f, chunk_size)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    finally:
+        fileobj.seek(0)
+    return path
+
+
+def upload_hash(uploaded_file, session_state):
+    """
+    Content hash of a Streamlit upload, computed once per upload rather than on
+    every script rerun (keyed by the uploader's file_id).
+    """
+    file_id = getattr(uploaded_file, "file_id", None) or (uploaded_file.name, uploaded_file.size)
+    cached = session_state.get("upload_digest")
+    if cached is None or cached[0] != file_id:
+        cached = (file_id, stream_sha256(uploaded_file))
+        session_state["upload_digest"] = cached
+    return cached[1]
@@ -0,0 +1,90 @@
+import os
+import cv2
+import shutil
+import tempfile
+import subprocess
+
+from workspace import scratch_path
+
+# libx264 settings for every rendered overlay (override per deployment via env)
+H264_PRESET = os.environ.get("H264_PRESET", "veryfast")
+H264_CRF = int(os.environ.get("H264_CRF", "23"))
+
+
+class H264Writer:
+    """
+    Drop-in replacement for cv2.VideoWriter that pipes raw BGR frames straight into
+    a single ffmpeg libx264 process, so each frame is encoded once into a
+    browser-playable MP4. Falls back to OpenCV's mp4v writer if ffmpeg is missing.
+    """
+
+    def __init__(self, fps, width, height, path=None, preset=None, crf=None):
+        if path is None:
+            # Unclaimed output lands in the workspace scratch dir, which the janitor sweeps
+            path = scratch_path("_h264.mp4")
+        self.path = path
+        self.proc = None
+        self.out = None
+        self._stderr = None
+
+        fps = fps or 30
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg:
+            cmd = [
+                ffmpeg, "-y", "-loglevel", "error",
+                "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(fps),
+                "-i", "-",
+                "-an", "-c:v", "libx264",
+                "-preset", preset or H264_PRESET, "-crf", str(crf if crf is not None else H264_CRF),
+                # yuv420p needs even dimensions; pad odd phone resolutions by a pixel
+                "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+                "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+                path,
+            ]
+            # stderr goes to an unnamed temp file, not a pipe: nobody reads it until release(),
+            # and a full pipe (e.g. repeated disk-full errors) would block ffmpeg and then our writes
+            self._stderr = tempfile.TemporaryFile()
+            self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+        else:
+            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+            self.out = cv2.VideoWriter(path, fourcc, fps, (width, height))
+
+    def _error_text(self):
+        self._stderr.seek(0)
+        return self._stderr.read().decode(errors="ignore").strip()
+
+    def write(self, frame):
+        if self.proc is not None:
+            try:
+                self.proc.stdin.write(frame.tobytes())
+            except BrokenPipeError:
+                self.proc.wait()
+                raise RuntimeError(f"ffmpeg failed to encode overlay video: {self._error_text()}") from None
+        else:
+            self.out.write(frame)
+
+    def release(self):
+        """Finishes the file and returns its path."""
+        if self.proc is not None:
+            self.proc.stdin.close()
+            try:
+                if self.proc.wait() != 0:
+                    raise RuntimeError(f"ffmpeg failed to encode overlay video: {self._error_text()}")
+            finally:
+                self._stderr.close()
+        else:
+            self.out.release()
+        return self.path
+
+    def abort(self):
+        """Stops encoding and deletes the partial file."""
+        if self.proc is not None:
+            self.proc.kill()
+            self.proc.wait()
+            self._stderr.close()
+        else:
+            self.out.release()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
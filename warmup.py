@@ -0,0 +1,140 @@
+"""
+Server boot warm-up: imports the heavy modules (cv2, MediaPipe, google-genai) and
+builds one Pose graph per tier, running it once on a blank frame, on a background
+thread so the first page renders immediately and the first lab click doesn't pay
+for model loading.
+
+Readiness: is_ready() in-process, or GET /ready on GOLF_READY_PORT (200 once
+the default tier is warm, 503 before) for a load balancer.
+
+Launch through this module so both start with the server process rather than
+on the first page view:
+
+    python warmup.py main.py [streamlit options]
+"""
+import os
+import sys
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Tiers worth having hot; "auto" can pick any of them
+WARM_TIERS = [t.strip() for t in os.environ.get("GOLF_WARM_TIERS", "lite,full,heavy").split(",") if t.strip()]
+READY_PORT = os.environ.get("GOLF_READY_PORT")
+
+_ready = threading.Event()
+_lock = threading.Lock()
+_thread = None
+_server = None
+status = {"state": "cold", "seconds": None, "error": None, "tiers": {}}
+
+
+def _warm_tier(tier, blank):
+    from pose_pool import get_pool
+    from pose_track import pose_settings
+
+    # The graph goes back to the shared pool, so the first real job reuses it
+    with get_pool(pose_settings(tier)).acquire() as pose:
+        pose.process(blank)
+
+
+def warm_up(tiers=None):
+    """
+    Loads everything a lab needs, one tier at a time. Blocking; start_warm_up()
+    runs it in the background. Ready as soon as the default tier is loaded
+    (pose_track.DEFAULT_TIER: POSE_TIER, or "full" when that is "auto"); a tier
+    whose model can't be fetched (offline, read-only site-packages) only fails
+    that tier, which labs will retry lazily.
+    """
+    started = time.perf_counter()
+    status["state"] = "warming"
+    try:
+        import numpy as np
+        import ai_coach  # noqa: F401  google-genai is slow to import
+        from pose_track import DEFAULT_TIER
+    except Exception as e:
+        status.update(state="failed", error=str(e))
+        print(f"Warm-up failed: {e}")
+        return False
+
+    blank = np.zeros((256, 256, 3), dtype=np.uint8)
+    tiers = list(tiers or WARM_TIERS)
+    # Default tier first, so readiness doesn't wait on the others
+    tiers.sort(key=lambda t: t != DEFAULT_TIER)
+    if DEFAULT_TIER not in tiers:
+        tiers.insert(0, DEFAULT_TIER)
+
+    for tier in tiers:
+        try:
+            _warm_tier(tier, blank)
+            status["tiers"][tier] = "ready"
+        except Exception as e:
+            status["tiers"][tier] = f"failed: {e}"
+            print(f"Warm-up of the {tier} pose model failed: {e}")
+            continue
+        if tier == DEFAULT_TIER:
+            status.update(state="ready", seconds=round(time.perf_counter() - started, 2))
+            _ready.set()
+
+    if not _ready.is_set():
+        status.update(state="failed", error=status["tiers"].get(DEFAULT_TIER))
+    return _ready.is_set()
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def start_warm_up(tiers=None):
+    """Starts warm_up() on a daemon thread (once per process) and the readiness endpoint if configured."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=warm_up, args=(tiers,), name="pose-warmup", daemon=True)
+            _thread.start()
+    if READY_PORT:
+        serve_readiness(int(READY_PORT))
+    return _thread
+
+
+class _ReadyHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/ready":
+            self.send_error(404)
+            return
+        body = status["state"].encode()
+        self.send_response(200 if is_ready() else 503)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # health checks every few seconds would drown the app logs
+
+
+def serve_readiness(port):
+    """Background /ready endpoint; later calls are no-ops."""
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+        _server = ThreadingHTTPServer(("0.0.0.0", port), _ReadyHandler)
+    threading.Thread(target=_server.serve_forever, name="golf-ready", daemon=True).start()
+    return _server
+
+
+def main(argv=None):
+    """`python warmup.py <app.py> [streamlit options]`: warm up, then run the app in this process."""
+    # Go through the importable module, not __main__, so the app's own
+    # `from warmup import ...` sees the same thread, server and status
+    import warmup
+    warmup.start_warm_up()
+
+    from streamlit.web import cli
+    sys.argv = ["streamlit", "run", *(sys.argv[1:] if argv is None else argv)]
+    return cli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,48 @@
 import streamlit as st
 import os
 
-# Your custom modules
-from ai_coach import vibe_coach, coach_chat
-from swing_analyzer import analyze_diagnostic_swing
-from wrist_tracker import drill_coach
+# Your custom modules. Only light ones up here: cv2, MediaPipe and google-genai are
+# imported where they're first needed (and preloaded by the warm-up thread), so the page renders first.
+from uploads import save_upload, upload_hash as content_hash
+from workspace import Workspace, start_janitor
+from warmup import start_warm_up
+import profiling
 
 st.set_page_config(page_title="AI Golf Academy", layout="centered")
 
+
+def progress_bar(label):
+    """A st.progress bar plus the progress(done, total, eta) callback the analyzers call per frame."""
+    bar = st.progress(0, text=label)
+
+    def update(done, total, eta):
+        if total:
+            left = f" (about {int(eta) + 1}s left)" if eta else ""
+            bar.progress(min(done / total, 1.0), text=label + left)
+    return bar, update
+
 # --- INITIALIZE APP MEMORY ---
 if "coach_report" not in st.session_state:
     st.session_state.coach_report = None
 if "chat_messages" not in st.session_state:
     st.session_state.chat_messages = []
+if "pose_track" not in st.session_state:
+    st.session_state.pose_track = None  # ((upload hash, tier), landmark track) shared by both labs
+if "workspace" not in st.session_state:
+    # This session's own directory for its upload and renders; removed when the session ends
+    st.session_state.workspace = Workspace("session")
+
+start_janitor()
+
+
+@st.cache_resource
+def boot():
+    # Once per server process: load pose models in the background before the first lab click.
+    # Already running (with /ready) when launched as `python warmup.py <app>`; this covers plain `streamlit run`
+    return start_warm_up()
+
+
+boot()
 
 # --- SIDEBAR: Coach Settings ---
 st.sidebar.title("⚙️ Coach Settings")
@@ -31,6 +61,35 @@ selected_model_display = st.sidebar.selectbox(
 )
 selected_model_id = MODELS[selected_model_display]
 
+# Pose model tier for the local labs; Auto drops to Lite at peak load instead of queueing
+POSE_MODELS = {
+    "🤖 Auto (Adapts to Clip & Load)": "auto",
+    "🪶 Lite (Fastest)": "lite",
+    "🎯 Full (Balanced)": "full",
+    "🔬 Heavy (Most Accurate)": "heavy",
+}
+
+selected_tier_display = st.sidebar.selectbox(
+    "Pose Model",
+    options=list(POSE_MODELS.keys()),
+    index=0,
+)
+selected_tier = POSE_MODELS[selected_tier_display]
+
+# What the AI coach is sent; smaller media means a faster, cheaper report
+COACH_MEDIA = {
+    "🎯 Swing Only (Trimmed Clip)": "proxy",
+    "🖼️ Key Positions (Stills)": "stills",
+    "🎞️ Full Upload": "full",
+}
+
+selected_media_display = st.sidebar.selectbox(
+    "Video Sent to Coach",
+    options=list(COACH_MEDIA.keys()),
+    index=0,
+)
+selected_media = COACH_MEDIA[selected_media_display]
+
 st.sidebar.divider()
 st.sidebar.info(f"Active Model: {selected_model_display}")
 
@@ -41,11 +100,37 @@ st.warning("📱 **iPhone Users:** To ensure video uploads and report downloads
 uploaded_file = st.file_uploader("Upload your swing...", type=["mp4", "mov", "avi", "m4v", "webm"])
 
 if uploaded_file is not None:
-    video_path = "temp_video.mp4"
-    with open(video_path, "wb") as f:
-        f.write(uploaded_file.read())
-        
+    from ai_coach import vibe_coach_stream, coach_session_stream, start_upload
+    from pose_cache import get_pose_track
+    from pose_track import resolve_tier
+
+    workspace = st.session_state.workspace
+    # Content hash of the upload: keys the on-disk landmark cache
+    # (hashed in chunks, once per upload)
+    upload_hash = content_hash(uploaded_file, st.session_state)
+
+    # Only (re)write on a new swing, so a background upload never reads a half-written file
+    if st.session_state.get("video_hash") != upload_hash:
+        # Chunked copy: never builds a second in-memory copy of a big slo-mo clip
+        video_path = save_upload(uploaded_file, workspace.file(f"swing_{upload_hash[:16]}.mp4"))
+        if st.session_state.get("video_path"):
+            workspace.drop(st.session_state.video_path)
+        st.session_state.video_path = workspace.keep(video_path)
+        st.session_state.video_hash = upload_hash
+        # Start the Gemini upload now; it is usually processed by the time the coach is asked
+        start_upload(video_path, video_hash=upload_hash, mode=selected_media)
+
+    video_path = st.session_state.video_path
     st.video(video_path)
+
+    def swing_track(progress=None):
+        # Decode + MediaPipe once per uploaded swing and tier choice; X-Ray and Wrist Lab reuse the same track
+        key = (upload_hash, selected_tier)
+        cached = st.session_state.pose_track
+        if cached is None or cached[0] != key:
+            tier = resolve_tier(selected_tier, video_path)
+            st.session_state.pose_track = (key, get_pose_track(video_path, video_hash=upload_hash, tier=tier, progress=progress))
+        return st.session_state.pose_track[1]
     
     # --- BALL STRIKING CONTEXT (V2) ---
     st.markdown("### Tell the Coach About the Shot")
@@ -64,16 +149,25 @@ if uploaded_file is not None:
 
     # --- 1. AI VIBE COACH ---
     if st.button("💬 Ask AI Vibe Coach", use_container_width=True):
+        streamed = False
         with st.spinner(f"Consulting {selected_model_display}..."):
             try:
                 result_context = f"Club: {club_type}, Shape: {shape}, Contact: {contact}, Direction: {direction}"
-                coach_report = vibe_coach(video_path, result_context, selected_model_id)
+                # Stream the report as it is written instead of waiting for the last token
+                coach_report = st.write_stream(vibe_coach_stream(
+                    video_path, result_context, selected_model_id,
+                    upload=start_upload(video_path, video_hash=upload_hash, mode=selected_media), upload_mode=selected_media,
+                ))
                 
                 # Save to memory to trigger the chat box!
                 st.session_state.coach_report = coach_report
                 st.session_state.chat_messages = []
+                streamed = True
             except Exception as e:
                 st.error(f"Error communicating with AI: {e}")
+        if streamed:
+            # Redraw so the finished report moves into the report/chat area below
+            st.rerun()
 
     # --- CHAT UI (Only shows if a report exists) ---
     if st.session_state.coach_report:
@@ -103,34 +197,49 @@ if uploaded_file is not None:
                 st.markdown(user_q)
                 
             with st.chat_message("assistant"):
-                with st.spinner("Coach is thinking..."):
-                    answer = coach_chat(user_q, st.session_state.coach_report, selected_model_id)
-                    st.markdown(answer)
-                    st.session_state.chat_messages.append({"role": "assistant", "content": answer})
+                # Tokens render as they arrive, so the first sentence shows up almost immediately
+                # Earlier turns (not this question) ride along, bounded; the swing itself is in Gemini's context cache
+                answer = st.write_stream(coach_session_stream(
+                    user_q, st.session_state.coach_report, selected_model_id, video_path,
+                    video_hash=upload_hash, history=st.session_state.chat_messages[:-1], upload_mode=selected_media,
+                ))
+                st.session_state.chat_messages.append({"role": "assistant", "content": answer})
 
     st.divider()
 
     # --- 2. X-RAY DIAGNOSTIC ---
     if st.button("🦴 Run X-Ray Diagnostic", use_container_width=True):
-        with st.spinner("Processing X-Ray Vision..."):
+        # Clicking Cancel (or any widget) reruns the script, which stops the render at the
+        # next progress update; the half-written video is discarded
+        st.button("✖️ Cancel", key="cancel_xray")
+        # profiling.collect(): the lab's log line covers this click only, pose extraction included
+        with st.spinner("Processing X-Ray Vision..."), profiling.collect():
             try:
-                xray_video_path = analyze_diagnostic_swing(video_path, club_type)
+                from swing_analyzer import analyze_diagnostic_swing
+                bar, progress = progress_bar("Processing X-Ray Vision...")
+                xray_video_path = analyze_diagnostic_swing(video_path, club_type, track=swing_track(progress), progress=progress,
+                                                           output_path=workspace.keep(workspace.file("xray.mp4")))
+                bar.empty()
+                # Serve from disk: a path for the player, a file handle for the download
+                st.video(xray_video_path, format="video/mp4")
                 with open(xray_video_path, "rb") as video_file:
-                    video_bytes = video_file.read()
-                st.video(video_bytes, format="video/mp4")
-                st.download_button("💾 Save X-Ray Video", data=video_bytes, file_name="XRay_Swing.mp4", mime="video/mp4", key="save_xray", use_container_width=True)
+                    st.download_button("💾 Save X-Ray Video", data=video_file, file_name="XRay_Swing.mp4", mime="video/mp4", key="save_xray", use_container_width=True)
             except Exception as e:
                 st.error(f"Error processing X-Ray: {e}")
 
     # --- 3. WRIST LAB ---
     if st.button("⌚ Run Wrist Lab", use_container_width=True):
-        with st.spinner("Analyzing Wrist Hinge..."):
+        st.button("✖️ Cancel", key="cancel_wrist")
+        with st.spinner("Analyzing Wrist Hinge..."), profiling.collect():
             try:
-                wrist_video_path = drill_coach(video_path, club_type)
+                from wrist_tracker import drill_coach
+                bar, progress = progress_bar("Analyzing Wrist Hinge...")
+                wrist_video_path = drill_coach(video_path, club_type, track=swing_track(progress), progress=progress,
+                                               output_path=workspace.keep(workspace.file("wrist.mp4")))
+                bar.empty()
+                st.video(wrist_video_path, format="video/mp4")
                 with open(wrist_video_path, "rb") as video_file:
-                    video_bytes = video_file.read()
-                st.video(video_bytes, format="video/mp4")
-                st.download_button("💾 Save Wrist Lab", data=video_bytes, file_name="Wrist_Lab.mp4", mime="video/mp4", key="save_wrist", use_container_width=True)
+                    st.download_button("💾 Save Wrist Lab", data=video_file, file_name="Wrist_Lab.mp4", mime="video/mp4", key="save_wrist", use_container_width=True)
             except Exception as e:
                 st.error(f"Error processing Wrist Lab: {e}")
 
@@ -140,6 +249,7 @@ if uploaded_file is not None:
         # Wipes the memory so you can start fresh!
         st.session_state.coach_report = None
         st.session_state.chat_messages = []
+        st.session_state.pose_track = None
         st.rerun()
 
 
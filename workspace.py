@@ -0,0 +1,165 @@
+import os
+import time
+import shutil
+import weakref
+import tempfile
+import threading
+from collections import Counter
+
+# Everything we write while analyzing (uploads, rendered overlays) lives under here,
+# one directory per session, so concurrent users never share a path.
+WORK_ROOT = os.environ.get("GOLF_WORK_DIR", os.path.join(tempfile.gettempdir(), "golf_academy"))
+# The janitor removes unreferenced files older than this, then the oldest ones
+# until the whole tree fits in the quota.
+WORK_MAX_AGE_SECONDS = float(os.environ.get("GOLF_WORK_MAX_AGE_HOURS", "6")) * 3600
+WORK_MAX_BYTES = int(os.environ.get("GOLF_WORK_MAX_MB", "2048")) * 1024 * 1024
+JANITOR_INTERVAL_SECONDS = 300
+
+# path -> number of holders; files with holders are never swept
+_refs = Counter()
+_lock = threading.Lock()
+_janitor = None
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def retain(path):
+    with _lock:
+        _refs[os.path.abspath(path)] += 1
+
+
+def release(path):
+    """Drops one reference; the file is deleted when the last one goes."""
+    path = os.path.abspath(path)
+    with _lock:
+        if _refs[path] <= 0:
+            return
+        _refs[path] -= 1
+        if _refs[path]:
+            return
+        del _refs[path]
+    _remove(path)
+
+
+def _close(path, kept):
+    for p in list(kept):
+        release(p)
+    kept.clear()
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class Workspace:
+    """
+    A unique directory for one session or job. Files handed to keep() are
+    reference-counted and survive the janitor until drop()ped; the whole
+    directory goes away on close() or when the Workspace is garbage-collected
+    (e.g. when Streamlit discards an ended session's state).
+    """
+
+    def __init__(self, prefix="session", root=None):
+        root = root or WORK_ROOT
+        os.makedirs(root, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix=f"{prefix}_", dir=root)
+        self._kept = set()
+        self._finalizer = weakref.finalize(self, _close, self.path, self._kept)
+
+    def file(self, name):
+        """Path for `name` inside this workspace."""
+        os.makedirs(self.path, exist_ok=True)  # the janitor may have removed an idle, empty dir
+        return os.path.join(self.path, name)
+
+    def new_file(self, suffix=""):
+        """A fresh, unique (empty) file path inside this workspace."""
+        os.makedirs(self.path, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.path)
+        os.close(fd)
+        return path
+
+    def keep(self, path):
+        path = os.path.abspath(path)
+        if path not in self._kept:
+            self._kept.add(path)
+            retain(path)
+        return path
+
+    def drop(self, path):
+        path = os.path.abspath(path)
+        if path in self._kept:
+            self._kept.discard(path)
+            release(path)
+
+    def close(self):
+        self._finalizer()
+
+
+def scratch_path(suffix=""):
+    """A unique file under WORK_ROOT for output nobody has claimed yet; swept by age."""
+    scratch = os.path.join(WORK_ROOT, "scratch")
+    os.makedirs(scratch, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=scratch)
+    os.close(fd)
+    return path
+
+
+def sweep(root=None, max_age=WORK_MAX_AGE_SECONDS, max_bytes=WORK_MAX_BYTES):
+    """Deletes stale unreferenced files, then the oldest ones until under max_bytes. Returns bytes freed."""
+    root = root or WORK_ROOT
+    now = time.time()
+    with _lock:
+        held = set(_refs)
+
+    files, dirs = [], []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if dirpath != root:
+            dirs.append(dirpath)
+        for name in filenames:
+            path = os.path.abspath(os.path.join(dirpath, name))
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+
+    freed = 0
+    total = sum(size for _, size, _ in files)
+    for mtime, size, path in sorted(files):
+        if path in held:
+            continue
+        if now - mtime > max_age or total > max_bytes:
+            _remove(path)
+            total -= size
+            freed += size
+
+    # Abandoned, now-empty workspaces
+    for d in sorted(dirs, key=len, reverse=True):
+        try:
+            if not os.listdir(d) and now - os.stat(d).st_mtime > max_age:
+                os.rmdir(d)
+        except OSError:
+            pass
+    return freed
+
+
+def start_janitor(interval=JANITOR_INTERVAL_SECONDS):
+    """Runs sweep() every `interval` seconds on a daemon thread; once per process."""
+    global _janitor
+    with _lock:
+        if _janitor is not None:
+            return _janitor
+
+        def run():
+            while True:
+                try:
+                    sweep()
+                except Exception as e:
+                    print(f"Workspace sweep failed: {e}")
+                time.sleep(interval)
+
+        _janitor = threading.Thread(target=run, name="workspace-janitor", daemon=True)
+        _janitor.start()
+        return _janitor